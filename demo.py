@@ -5,7 +5,6 @@ This script demonstrates the key features and functionality of the system.
 """
 
 from kv_store import create_kv_store
-import json
 import time
 
 def print_separator(title):
@@ -153,19 +152,19 @@ def demo_range_queries(kv_store):
     print("\n🔹 Range Query Examples:")
     
     # Get all users
-    users = kv_store.get_range("user:", "user;")  # Using ; as it comes after : in ASCII
+    users = kv_store.get_prefix("user:")
     print(f"   👥 Users ({len(users)} found):")
     for key, user in users.items():
         print(f"      • {key}: {user['name']}")
     
     # Get all products
-    products = kv_store.get_range("product:", "product;")
+    products = kv_store.get_prefix("product:")
     print(f"\n   🛍️  Products ({len(products)} found):")
     for key, product in products.items():
         print(f"      • {product['name']}: ${product['price']}")
     
     # Get all configs
-    configs_result = kv_store.get_range("config:", "config;")
+    configs_result = kv_store.get_prefix("config:")
     print(f"\n   ⚙️  Configuration ({len(configs_result)} found):")
     for key, value in configs_result.items():
         print(f"      • {key.replace('config:', '')}: {value}")
@@ -1,9 +1,13 @@
+import logging
 import os
 import threading
 from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime
 
 from lsm_tree import LSMTree
+from rwlock import ReadWriteLock
+
+logger = logging.getLogger("kv_store")
 
 
 class KeyValueStore:
@@ -12,33 +16,39 @@ class KeyValueStore:
     with Write-Ahead Logging, SSTables, and compaction strategies.
     """
     
-    def __init__(self, data_dir: str = "kv_data", wal_file: str = "kv_wal.log"):
+    def __init__(self, data_dir: str = "kv_data", wal_file: str = "kv_wal.log",
+                 min_wal_sync_interval: float = 0.001):
         """
         Initialize the key-value store.
-        
+
         Args:
             data_dir: Directory to store SSTable files
             wal_file: Path to Write-Ahead Log file
+            min_wal_sync_interval: Group-commit window for WAL fsyncs (seconds)
         """
         self.data_dir = data_dir
         self.wal_file = wal_file
-        self.lock = threading.RLock()
-        
+        # Reader-writer lock: reads share, writers are exclusive
+        self.lock = ReadWriteLock()
+
         # Create data directory if it doesn't exist
         os.makedirs(data_dir, exist_ok=True)
-        
+
         # Initialize LSM Tree
-        self.lsm_tree = LSMTree(data_dir, wal_file)
+        self.lsm_tree = LSMTree(data_dir, wal_file, wal_sync_interval=min_wal_sync_interval)
         
-        print(f"Key-Value Store initialized with data directory: {data_dir}")
-        self._print_startup_stats()
+        logger.info("Key-Value Store initialized with data directory: %s", data_dir)
+        self._log_startup_stats()
     
-    def _print_startup_stats(self):
-        """Print startup statistics"""
+    def _log_startup_stats(self):
+        """Log startup statistics (skips the stats walk when logging is off)"""
+        if not logger.isEnabledFor(logging.INFO):
+            return
         stats = self.lsm_tree.get_stats()
-        print(f"Startup stats: {stats['total_active_keys']} keys, "
-              f"{stats['sstables']['count']} SSTables, "
-              f"{stats['wal']['total_entries']} WAL entries")
+        logger.info("Startup stats: %s keys, %s SSTables, %s WAL entries",
+                    stats['total_active_keys'],
+                    stats['sstables']['count'],
+                    stats['wal']['total_entries'])
     
     # CRUD Operations
     
@@ -50,13 +60,8 @@ class KeyValueStore:
         if not isinstance(key, str) or not key.strip():
             raise ValueError("Key must be a non-empty string")
         
-        with self.lock:
-            # Check if key already exists
-            if self.lsm_tree.get(key) is not None:
-                return False
-            
-            # Create the key-value pair
-            return self.lsm_tree.put(key, value)
+        # Atomic check-and-put inside the LSM tree; no outer lock needed
+        return self.lsm_tree.put_if_absent(key, value)
     
     def read(self, key: str) -> Optional[Any]:
         """
@@ -65,8 +70,9 @@ class KeyValueStore:
         """
         if not isinstance(key, str) or not key.strip():
             raise ValueError("Key must be a non-empty string")
-        
-        return self.lsm_tree.get(key)
+
+        with self.lock.read_locked():
+            return self.lsm_tree.get(key)
     
     def update(self, key: str, value: Any) -> bool:
         """
@@ -76,13 +82,8 @@ class KeyValueStore:
         if not isinstance(key, str) or not key.strip():
             raise ValueError("Key must be a non-empty string")
         
-        with self.lock:
-            # Check if key exists
-            if self.lsm_tree.get(key) is None:
-                return False
-            
-            # Update the key-value pair
-            return self.lsm_tree.put(key, value)
+        # Atomic check-and-put inside the LSM tree; no outer lock needed
+        return self.lsm_tree.put_if_present(key, value)
     
     def delete(self, key: str) -> bool:
         """
@@ -91,8 +92,13 @@ class KeyValueStore:
         """
         if not isinstance(key, str) or not key.strip():
             raise ValueError("Key must be a non-empty string")
-        
-        return self.lsm_tree.delete(key)
+
+        with self.lock.write_locked():
+            existed = self.lsm_tree.delete(key, sync=False)
+        # Await durability after releasing the write lock so readers and
+        # other writers proceed while this delete waits on the group fsync
+        self.lsm_tree.wal.sync()
+        return existed
     
     def put(self, key: str, value: Any) -> bool:
         """
@@ -102,9 +108,27 @@ class KeyValueStore:
         """
         if not isinstance(key, str) or not key.strip():
             raise ValueError("Key must be a non-empty string")
-        
-        return self.lsm_tree.put(key, value)
+
+        with self.lock.write_locked():
+            result = self.lsm_tree.put(key, value, sync=False)
+        # Await durability outside the write lock: concurrent writers
+        # queue behind the same group commit instead of serializing
+        # reads and writes through a held lock for a full sync interval
+        self.lsm_tree.wal.sync()
+        return result
     
+    def put_async(self, key: str, value: Any) -> bool:
+        """
+        Put a key-value pair without waiting for the WAL fsync.
+        The write is still logged and applied; durability is provided by the
+        next group commit. Use for callers that don't need sync durability.
+        """
+        if not isinstance(key, str) or not key.strip():
+            raise ValueError("Key must be a non-empty string")
+
+        with self.lock.write_locked():
+            return self.lsm_tree.put(key, value, sync=False)
+
     def get(self, key: str) -> Optional[Any]:
         """Alias for read method"""
         return self.read(key)
@@ -117,30 +141,59 @@ class KeyValueStore:
     
     def get_all_keys(self) -> List[str]:
         """Get all keys in the store"""
-        return self.lsm_tree.get_all_keys()
+        with self.lock.read_locked():
+            return self.lsm_tree.get_all_keys()
     
     def get_all_items(self) -> Dict[str, Any]:
         """Get all key-value pairs in the store"""
-        result = {}
-        for key in self.get_all_keys():
-            value = self.read(key)
-            if value is not None:
-                result[key] = value
-        return result
-    
+        return dict(self.iter_range())
+
+    def iter_range(self, start_key: str = None, end_key: str = None):
+        """
+        Lazily iterate (key, value) pairs in a range [start_key, end_key).
+        Streams from the LSM tree's merge iterator without materializing
+        the whole result; preferred over get_range for large scans.
+        """
+        return self.lsm_tree.iter_range(start_key, end_key)
+
     def get_range(self, start_key: str = None, end_key: str = None) -> Dict[str, Any]:
         """
         Get all key-value pairs in a range [start_key, end_key).
-        
+        Materializes the result; see iter_range for a streaming variant.
+
         Args:
             start_key: Starting key (inclusive). None means start from beginning.
             end_key: Ending key (exclusive). None means go to end.
         """
-        return self.lsm_tree.get_range(start_key, end_key)
+        with self.lock.read_locked():
+            return self.lsm_tree.get_range(start_key, end_key)
     
+    @staticmethod
+    def _prefix_upper_bound(prefix: str) -> Optional[str]:
+        """
+        Compute the smallest key that sorts after every key with the given
+        prefix, by incrementing the last incrementable character. Returns
+        None when no such bound exists (scan to the end instead).
+        """
+        for i in range(len(prefix) - 1, -1, -1):
+            if ord(prefix[i]) < 0x10FFFF:
+                return prefix[:i] + chr(ord(prefix[i]) + 1)
+        return None
+
+    def get_prefix(self, prefix: str) -> Dict[str, Any]:
+        """
+        Get all key-value pairs whose key starts with the given prefix.
+        Computes the exclusive upper bound correctly for any prefix, unlike
+        manual tricks such as get_range('user:', 'user;').
+        """
+        if not isinstance(prefix, str) or not prefix:
+            raise ValueError("Prefix must be a non-empty string")
+
+        return self.get_range(prefix, self._prefix_upper_bound(prefix))
+
     def count(self) -> int:
-        """Get total number of key-value pairs"""
-        return len(self.get_all_keys())
+        """Get total number of key-value pairs in O(1)"""
+        return self.lsm_tree.active_key_count()
     
     def is_empty(self) -> bool:
         """Check if the store is empty"""
@@ -148,23 +201,23 @@ class KeyValueStore:
     
     def clear(self):
         """Clear all data from the store"""
-        with self.lock:
+        with self.lock.write_locked():
             self.lsm_tree.clear_all_data()
-            print("Key-Value Store cleared")
+            logger.info("Key-Value Store cleared")
     
     # Maintenance Operations
     
     def force_flush(self):
         """Force flush memtable to SSTable"""
-        with self.lock:
+        with self.lock.write_locked():
             self.lsm_tree.force_flush()
-            print("Memtable flushed to SSTable")
+            logger.debug("Memtable flushed to SSTable")
     
     def force_compaction(self):
         """Force compaction of SSTables"""
-        with self.lock:
+        with self.lock.write_locked():
             self.lsm_tree.force_compact()
-            print("SSTable compaction completed")
+            logger.debug("SSTable compaction completed")
     
     def get_stats(self) -> Dict:
         """Get comprehensive statistics about the key-value store"""
@@ -216,30 +269,52 @@ class KeyValueStore:
     def batch_put(self, items: Dict[str, Any]) -> Dict[str, bool]:
         """
         Put multiple key-value pairs in a batch.
+        All writes share a single group-commit fsync at the end instead of
+        one fsync per item.
         Returns a dictionary mapping each key to success status.
         """
+        return self._batch_put(items, sync=True)
+
+    def batch_put_async(self, items: Dict[str, Any]) -> Dict[str, bool]:
+        """
+        Put multiple key-value pairs without waiting for any WAL fsync.
+        Returns a dictionary mapping each key to success status.
+        """
+        return self._batch_put(items, sync=False)
+
+    def _batch_put(self, items: Dict[str, Any], sync: bool) -> Dict[str, bool]:
+        """Validate keys and apply the batch via a single put_many call"""
         results = {}
-        with self.lock:
-            for key, value in items.items():
-                try:
-                    results[key] = self.put(key, value)
-                except Exception as e:
-                    results[key] = False
-                    print(f"Error putting key '{key}': {e}")
+        valid_items = {}
+        for key, value in items.items():
+            if isinstance(key, str) and key.strip():
+                valid_items[key] = value
+            else:
+                results[key] = False
+                logger.error("Error putting key %r: Key must be a non-empty string", key)
+
+        with self.lock.write_locked():
+            results.update(self.lsm_tree.put_many(valid_items, sync=False))
+        # One fsync wait for the whole batch, outside the write lock
+        if sync:
+            self.lsm_tree.wal.sync()
         return results
     
     def batch_get(self, keys: List[str]) -> Dict[str, Any]:
         """
         Get multiple values by keys in a batch.
+        Uses a single multi-get pass through the LSM tree instead of one
+        full lookup per key.
         Returns a dictionary mapping each key to its value (or None if not found).
         """
         results = {}
+        valid_keys = []
         for key in keys:
-            try:
-                results[key] = self.read(key)
-            except Exception as e:
+            if isinstance(key, str) and key.strip():
+                valid_keys.append(key)
+            else:
                 results[key] = None
-                print(f"Error getting key '{key}': {e}")
+        results.update(self.lsm_tree.multi_get(valid_keys))
         return results
     
     def batch_delete(self, keys: List[str]) -> Dict[str, bool]:
@@ -248,13 +323,17 @@ class KeyValueStore:
         Returns a dictionary mapping each key to success status.
         """
         results = {}
-        with self.lock:
+        with self.lock.write_locked():
             for key in keys:
                 try:
-                    results[key] = self.delete(key)
+                    if not isinstance(key, str) or not key.strip():
+                        raise ValueError("Key must be a non-empty string")
+                    results[key] = self.lsm_tree.delete(key, sync=False)
                 except Exception as e:
                     results[key] = False
-                    print(f"Error deleting key '{key}': {e}")
+                    logger.error("Error deleting key %r: %s", key, e)
+        # One fsync for the whole batch, outside the write lock
+        self.lsm_tree.wal.sync()
         return results
     
     # Context Manager Support
@@ -293,18 +372,21 @@ class KeyValueStore:
 
 
 # Factory function for easy initialization
-def create_kv_store(data_dir: str = "kv_data", wal_file: str = "kv_wal.log") -> KeyValueStore:
+def create_kv_store(data_dir: str = "kv_data", wal_file: str = "kv_wal.log",
+                    min_wal_sync_interval: float = 0.001) -> KeyValueStore:
     """
     Factory function to create a new KeyValueStore instance.
-    
+
     Args:
         data_dir: Directory to store SSTable files
         wal_file: Path to Write-Ahead Log file
-    
+        min_wal_sync_interval: Group-commit window for WAL fsyncs (seconds)
+
     Returns:
         KeyValueStore instance
     """
-    return KeyValueStore(data_dir, wal_file)
+    return KeyValueStore(data_dir, wal_file,
+                         min_wal_sync_interval=min_wal_sync_interval)
 
 
 # Example usage and testing
@@ -1,11 +1,17 @@
+import heapq
+import logging
+import queue
 import threading
-from datetime import datetime
-from typing import Any, Dict, List, Optional
-from collections import OrderedDict
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sortedcontainers import SortedDict
 
 from wal import WriteAheadLog, WALOperation
 from sstable import SSTable, SSTableManager, SSTableEntry
 
+logger = logging.getLogger("lsm_tree")
+
 
 class Memtable:
     """
@@ -16,63 +22,122 @@ class Memtable:
     MAX_SIZE = 30  # Maximum number of entries before flush to SSTable
     
     def __init__(self):
-        self.data = OrderedDict()  # Maintains insertion order
-        self.lock = threading.RLock()
-        self._sort_required = False
-    
-    def put(self, key: str, value: Any, timestamp: datetime = None):
+        # Structure-of-arrays layout: the sorted index maps key -> slot in
+        # the parallel arrays below, so each write costs one list append
+        # instead of a fresh per-entry dict
+        self.index = SortedDict()  # key -> slot, keys ordered (O(log n))
+        self.values: List[Any] = []
+        self.timestamps: List[int] = []
+        self.deleted_flags = bytearray()
+        # Plain Lock: no method re-enters it, and Lock skips RLock's
+        # owner-tracking overhead
+        self.lock = threading.Lock()
+
+    def _set(self, key: str, value: Any, timestamp: int, deleted: bool):
+        """Write one record, reusing the slot if the key already exists"""
+        slot = self.index.get(key)
+        if slot is None:
+            self.index[key] = len(self.values)
+            self.values.append(value)
+            self.timestamps.append(timestamp)
+            self.deleted_flags.append(deleted)
+        else:
+            self.values[slot] = value
+            self.timestamps[slot] = timestamp
+            self.deleted_flags[slot] = deleted
+
+    def put(self, key: str, value: Any, timestamp: int = None):
         """Insert or update a key-value pair"""
         with self.lock:
-            timestamp = timestamp or datetime.now()
-            self.data[key] = {'value': value, 'timestamp': timestamp, 'deleted': False}
-            self._sort_required = True
-    
+            self._set(key, value,
+                      time.time_ns() if timestamp is None else timestamp, False)
+
     def get(self, key: str) -> Optional[Any]:
         """Get value by key"""
         with self.lock:
-            entry = self.data.get(key)
-            if entry and not entry['deleted']:
-                return entry['value']
+            slot = self.index.get(key)
+            if slot is not None and not self.deleted_flags[slot]:
+                return self.values[slot]
             return None
-    
-    def delete(self, key: str, timestamp: datetime = None):
+
+    def lookup(self, key: str) -> Optional[Tuple[Any, bool]]:
+        """Get (value, deleted) for a key, or None if the key is absent"""
+        with self.lock:
+            slot = self.index.get(key)
+            if slot is None:
+                return None
+            return self.values[slot], bool(self.deleted_flags[slot])
+
+    def delete(self, key: str, timestamp: int = None):
         """Mark a key as deleted (tombstone)"""
         with self.lock:
-            timestamp = timestamp or datetime.now()
-            self.data[key] = {'value': None, 'timestamp': timestamp, 'deleted': True}
-            self._sort_required = True
-    
+            self._set(key, None,
+                      time.time_ns() if timestamp is None else timestamp, True)
+
+    def iter_entries(self) -> Iterator[Tuple[str, Any, bool]]:
+        """Yield (key, value, deleted) tuples in sorted key order"""
+        with self.lock:
+            for key, slot in self.index.items():
+                yield key, self.values[slot], bool(self.deleted_flags[slot])
+
     def get_sorted_entries(self) -> List[SSTableEntry]:
         """Get all entries sorted by key"""
+        with self.lock:
+            # The index keeps keys ordered incrementally, so this is a
+            # plain O(n) walk with no sort at flush time. Entries are
+            # constructed inline: one call per entry, no helper frame.
+            values = self.values
+            timestamps = self.timestamps
+            deleted_flags = self.deleted_flags
+            return [SSTableEntry(key, values[slot], timestamps[slot],
+                                 bool(deleted_flags[slot]))
+                    for key, slot in self.index.items()]
+
+    def get_range_entries(self, start_key: str = None,
+                          end_key: str = None) -> List[SSTableEntry]:
+        """Get entries with start_key <= key < end_key in O(log n + k)"""
         with self.lock:
             entries = []
-            for key in sorted(self.data.keys()):
-                entry_data = self.data[key]
-                entries.append(SSTableEntry(
-                    key=key,
-                    value=entry_data['value'],
-                    timestamp=entry_data['timestamp'],
-                    deleted=entry_data['deleted']
-                ))
+            for key in self.index.irange(start_key, end_key,
+                                         inclusive=(True, False)):
+                slot = self.index[key]
+                entries.append(SSTableEntry(key, self.values[slot],
+                                            self.timestamps[slot],
+                                            bool(self.deleted_flags[slot])))
             return entries
-    
+
     def is_full(self) -> bool:
         """Check if memtable has reached maximum capacity"""
-        return len(self.data) >= self.MAX_SIZE
-    
+        return len(self.index) >= self.MAX_SIZE
+
     def is_empty(self) -> bool:
         """Check if memtable is empty"""
-        return len(self.data) == 0
-    
+        return len(self.index) == 0
+
     def size(self) -> int:
         """Get number of entries in memtable"""
-        return len(self.data)
-    
+        return len(self.index)
+
+    def bulk_load(self, sorted_records):
+        """
+        Build the memtable in one pass from (key, value, timestamp,
+        deleted) records pre-sorted by unique key. In-order inserts let
+        the sorted index grow linearly instead of searching per key.
+        """
+        with self.lock:
+            for key, value, timestamp, deleted in sorted_records:
+                self.index[key] = len(self.values)
+                self.values.append(value)
+                self.timestamps.append(timestamp)
+                self.deleted_flags.append(deleted)
+
     def clear(self):
         """Clear all entries from memtable"""
         with self.lock:
-            self.data.clear()
-            self._sort_required = False
+            self.index.clear()
+            self.values.clear()
+            self.timestamps.clear()
+            self.deleted_flags.clear()
 
 
 class LSMTree:
@@ -81,145 +146,372 @@ class LSMTree:
     Provides efficient writes through memtable and efficient reads through SSTables.
     """
     
-    def __init__(self, data_dir: str = "data", wal_file: str = "wal.log"):
+    def __init__(self, data_dir: str = "data", wal_file: str = "wal.log",
+                 wal_sync_interval: float = WriteAheadLog.DEFAULT_SYNC_INTERVAL):
         self.memtable = Memtable()
-        self.wal = WriteAheadLog(wal_file)
+        self.wal = WriteAheadLog(wal_file, sync_interval=wal_sync_interval)
         self.sstable_manager = SSTableManager(data_dir)
-        self.lock = threading.RLock()
+        # Plain Lock: internal callers use the *_locked helpers instead of
+        # re-entering through the public methods
+        self.lock = threading.Lock()
         self.compaction_threshold = 5  # Number of SSTables that trigger compaction
-        
+        self._active_count = 0  # Incrementally maintained count of live keys
+
+        # Memtables that are full and waiting to be flushed. Writes go to
+        # self.memtable; readers consult these (newest first) between the
+        # active memtable and the SSTables.
+        self.immutable_memtables: List[Memtable] = []
+
+        # Background workers: one thread flushes immutable memtables, one
+        # runs compactions, so writes never stall behind either
+        self._flush_queue: "queue.Queue" = queue.Queue()
+        self._compaction_queue: "queue.Queue" = queue.Queue()
+        self._compaction_pending = False
+        self._flush_thread = threading.Thread(target=self._flush_worker, daemon=True)
+        self._compaction_thread = threading.Thread(target=self._compaction_worker, daemon=True)
+        self._flush_thread.start()
+        self._compaction_thread.start()
+
         # Recovery from WAL on startup
         self._recover_from_wal()
+
+        # Seed the live-key counter once; afterwards it's maintained
+        # incrementally by put/delete
+        self._active_count = len(self.get_all_keys())
     
     def _recover_from_wal(self):
         """Recover state from Write-Ahead Log"""
-        print("Recovering from WAL...")
-        entries = self.wal.get_all_entries()
-        
-        for entry in entries:
-            if entry.operation == WALOperation.PUT:
-                self.memtable.put(entry.key, entry.value, entry.timestamp)
-            elif entry.operation == WALOperation.DELETE:
-                self.memtable.delete(entry.key, entry.timestamp)
+        logger.info("Recovering from WAL...")
+        recovered = 0
+
+        # Coalesce while streaming: only the newest record per key
+        # survives, so re-written keys cost one dict store instead of a
+        # memtable insert each
+        latest: Dict[str, Tuple[Any, int, bool]] = {}
+        for entry in self.wal.iter_entries():
+            latest[entry.key] = (entry.value, entry.timestamp,
+                                 entry.operation == WALOperation.DELETE)
+            recovered += 1
+
+        # One sort, then a linear in-order build of the memtable
+        self.memtable.bulk_load(
+            (key, value, timestamp, deleted)
+            for key, (value, timestamp, deleted) in sorted(latest.items()))
         
-        print(f"Recovered {len(entries)} operations from WAL")
+        logger.info("Recovered %d operations from WAL", recovered)
         
-        # If memtable is full after recovery, flush it
+        # If memtable is full after recovery, hand it to the flush worker
         if self.memtable.is_full():
-            self._flush_memtable()
+            with self.lock:
+                self._schedule_flush()
     
-    def put(self, key: str, value: Any) -> bool:
+    def put(self, key: str, value: Any, sync: bool = True) -> bool:
         """
         Insert or update a key-value pair.
+        With sync=False the WAL fsync is not awaited (fire-and-forget).
         Returns True if successful.
         """
         with self.lock:
-            # Log operation to WAL first
-            self.wal.log_operation(WALOperation.PUT, key, value)
-            
-            # Add to memtable
-            self.memtable.put(key, value)
-            
-            # Check if memtable needs to be flushed
-            if self.memtable.is_full():
-                self._flush_memtable()
-            
-            # Check if compaction is needed
-            self._maybe_compact()
-            
-            return True
+            result = self._put_locked(key, value)
+        # Wait for the group commit outside the tree lock, so concurrent
+        # writers queue up behind the same fsync instead of serializing
+        # on it one at a time
+        if sync:
+            self.wal.sync()
+        return result
+
+    def _put_locked(self, key: str, value: Any) -> bool:
+        """Apply one put; self.lock must already be held. Does not await
+        the WAL fsync — callers needing durability sync after unlocking."""
+        # Log operation to WAL first
+        self.wal.log_operation(WALOperation.PUT, key, value, sync=False)
+
+        # Track whether this put introduces a new live key
+        if self._get_locked(key) is None:
+            self._active_count += 1
+
+        # Add to memtable
+        self.memtable.put(key, value)
+
+        # Hand a full memtable to the background flush worker; writes
+        # continue against a fresh memtable immediately
+        if self.memtable.is_full():
+            self._schedule_flush()
+
+        return True
     
+    def put_many(self, items: Dict[str, Any], sync: bool = True) -> Dict[str, bool]:
+        """
+        Insert or update multiple key-value pairs under one lock acquisition
+        and one WAL append, sharing a single group-commit fsync at the end
+        instead of paying lock + WAL write + fsync per item.
+        Returns a dict mapping each key to success status.
+        """
+        if not items:
+            return {}
+
+        with self.lock:
+            # One WAL append for the whole batch
+            self.wal.log_batch([
+                (WALOperation.PUT, key, value) for key, value in items.items()
+            ])
+
+            for key, value in items.items():
+                if self._get_locked(key) is None:
+                    self._active_count += 1
+                self.memtable.put(key, value)
+
+                if self.memtable.is_full():
+                    self._schedule_flush()
+
+        # One fsync wait for the whole batch, outside the tree lock
+        if sync:
+            self.wal.sync()
+
+        return {key: True for key in items}
+
+    def put_if_absent(self, key: str, value: Any) -> bool:
+        """
+        Put a key-value pair only if the key is not already present.
+        The existence probe and the write commit under the same lock, so
+        concurrent creates cannot race.
+        Returns True if the key was created, False if it already existed.
+        """
+        with self.lock:
+            if self._get_locked(key) is not None:
+                return False
+            result = self._put_locked(key, value)
+        self.wal.sync()
+        return result
+
+    def put_if_present(self, key: str, value: Any) -> bool:
+        """
+        Put a key-value pair only if the key already exists.
+        Probe and commit happen atomically under the same lock.
+        Returns True if the key was updated, False if it doesn't exist.
+        """
+        with self.lock:
+            if self._get_locked(key) is None:
+                return False
+            result = self._put_locked(key, value)
+        self.wal.sync()
+        return result
+
     def get(self, key: str) -> Optional[Any]:
         """
         Retrieve value by key.
         Searches memtable first, then SSTables from newest to oldest.
         """
         with self.lock:
-            # Check memtable first (most recent data)
-            value = self.memtable.get(key)
-            if value is not None:
+            return self._get_locked(key)
+
+    def _get_locked(self, key: str) -> Optional[Any]:
+        """Lookup assuming self.lock is already held"""
+        # Check memtable first (most recent data): one lookup resolves
+        # live values and tombstones alike
+        found = self.memtable.lookup(key)
+        if found is not None:
+            value, deleted = found
+            return None if deleted else value
+
+        # Check immutable memtables awaiting flush (newest first)
+        for immutable in reversed(self.immutable_memtables):
+            found = immutable.lookup(key)
+            if found is not None:
+                value, deleted = found
+                return None if deleted else value
+
+        # Search SSTables from newest to oldest
+        sstables = self.sstable_manager.get_sstables()
+        for sstable in reversed(sstables):  # Newest first
+            # Cheap disqualifications first: key-span check, then the
+            # bloom filter
+            if not sstable.key_in_range(key):
+                continue
+            if not sstable.may_contain(key):
+                continue
+
+            # One binary search resolves value and tombstone together
+            value, key_found = sstable.get_with_tombstone(key)
+            if key_found:
                 return value
-            
-            # Check if key is marked as deleted in memtable
-            if key in self.memtable.data and self.memtable.data[key]['deleted']:
-                return None
-            
-            # Search SSTables from newest to oldest
-            sstables = self.sstable_manager.get_sstables()
-            for sstable in reversed(sstables):  # Newest first
-                value = sstable.get(key)
-                if value is not None:
-                    return value
-                
-                # Check if key is marked as deleted in this SSTable
-                entries = sstable.get_all_entries()
-                for entry in entries:
-                    if entry.key == key and entry.deleted:
-                        return None
-            
-            return None
+
+        return None
     
-    def delete(self, key: str) -> bool:
+    def multi_get(self, keys: List[str]) -> Dict[str, Optional[Any]]:
+        """
+        Retrieve values for multiple keys in a single pass.
+        Takes the lock once, resolves all keys against the memtable, then
+        streams each SSTable (newest to oldest) with an ordered merge-join
+        against the still-unresolved keys. Much faster than calling get()
+        per key since lock acquisition and SSTable scans are amortized.
+        Returns a dict mapping each key to its value (None if not found).
+        """
+        with self.lock:
+            results = {key: None for key in keys}
+            remaining = set()
+
+            # Resolve against memtable first (most recent data)
+            for key in keys:
+                found = self.memtable.lookup(key)
+                if found is not None:
+                    # Key resolved: either a live value or a tombstone (None)
+                    value, deleted = found
+                    if not deleted:
+                        results[key] = value
+                else:
+                    remaining.add(key)
+
+            # Resolve against immutable memtables awaiting flush
+            for immutable in reversed(self.immutable_memtables):
+                if not remaining:
+                    break
+                for key in list(remaining):
+                    found = immutable.lookup(key)
+                    if found is not None:
+                        value, deleted = found
+                        if not deleted:
+                            results[key] = value
+                        remaining.discard(key)
+
+            # Stream SSTables newest to oldest, merge-joining sorted keys
+            # against each table's sorted entries
+            sstables = self.sstable_manager.get_sstables()
+            for sstable in reversed(sstables):
+                if not remaining:
+                    break
+
+                entry_iter = sstable.iter_entries()
+                entry = next(entry_iter, None)
+
+                for key in sorted(remaining):
+                    while entry is not None and entry.key < key:
+                        entry = next(entry_iter, None)
+                    if entry is not None and entry.key == key:
+                        if not entry.deleted:
+                            results[key] = entry.value
+                        remaining.discard(key)
+
+            return results
+
+    def delete(self, key: str, sync: bool = True) -> bool:
         """
         Delete a key-value pair.
+        With sync=False the WAL fsync is not awaited (fire-and-forget).
         Returns True if key existed, False otherwise.
         """
         with self.lock:
             # Log operation to WAL first
-            self.wal.log_operation(WALOperation.DELETE, key)
-            
+            self.wal.log_operation(WALOperation.DELETE, key, sync=False)
+
             # Check if key exists
-            existed = self.get(key) is not None
-            
+            existed = self._get_locked(key) is not None
+            if existed:
+                self._active_count -= 1
+
             # Add tombstone to memtable
             self.memtable.delete(key)
-            
-            # Check if memtable needs to be flushed
+
+            # Hand a full memtable to the background flush worker
             if self.memtable.is_full():
-                self._flush_memtable()
-            
-            # Check if compaction is needed
-            self._maybe_compact()
-            
-            return existed
+                self._schedule_flush()
+
+        # Await the group commit outside the tree lock (see put)
+        if sync:
+            self.wal.sync()
+        return existed
     
-    def _flush_memtable(self):
-        """Flush memtable to a new SSTable"""
+    def _schedule_flush(self, done_event: threading.Event = None):
+        """
+        Swap the active memtable into the immutable list and hand it to the
+        flush worker. Must be called with self.lock held. The optional
+        done_event is set once the flush has hit disk.
+        """
         if self.memtable.is_empty():
+            if done_event:
+                done_event.set()
             return
-        
-        print("Flushing memtable to SSTable...")
-        
-        # Create new SSTable
-        sstable = self.sstable_manager.create_sstable()
-        
-        # Transfer all entries from memtable to SSTable
-        entries = self.memtable.get_sorted_entries()
-        for entry in entries:
-            sstable.entries.append(entry)
-        
+
+        full_memtable = self.memtable
+        self.immutable_memtables.append(full_memtable)
+        self.memtable = Memtable()
+        self._flush_queue.put((full_memtable, done_event))
+
+    def _flush_worker(self):
+        """Background worker: writes queued immutable memtables to SSTables"""
+        while True:
+            memtable, done_event = self._flush_queue.get()
+            try:
+                self._flush_memtable(memtable)
+            except Exception:
+                # Keep the memtable in immutable_memtables so its keys
+                # stay readable (they are still in the WAL), and retry
+                # after a pause instead of letting the worker thread die
+                logger.exception("Memtable flush failed; will retry")
+                # Re-queue before task_done so queue.join() callers keep
+                # waiting for the retry instead of waking early
+                self._flush_queue.put((memtable, done_event))
+                self._flush_queue.task_done()
+                time.sleep(1.0)
+                continue
+
+            with self.lock:
+                if memtable in self.immutable_memtables:
+                    self.immutable_memtables.remove(memtable)
+            if done_event:
+                done_event.set()
+            self._maybe_schedule_compaction()
+            self._flush_queue.task_done()
+
+    def _flush_memtable(self, memtable: 'Memtable'):
+        """Flush one (immutable) memtable to a new SSTable"""
+        if memtable.is_empty():
+            return
+
+        logger.debug("Flushing memtable to SSTable...")
+
+        # Build the entries first and register the table already
+        # populated: a table that is momentarily visible empty would be
+        # deregistered by a concurrent cleanup_empty_tables, orphaning
+        # every flushed key until restart
+        entries = memtable.get_sorted_entries()
+        sstable = self.sstable_manager.create_sstable(entries)
+
         sstable._save_to_file()
-        
-        # Clear memtable
-        self.memtable.clear()
-        
-        print(f"Flushed {len(entries)} entries to SSTable {sstable.table_id}")
-    
-    def _maybe_compact(self):
-        """Check if compaction is needed and perform it"""
-        sstables = self.sstable_manager.get_sstables()
-        
-        if len(sstables) >= self.compaction_threshold:
-            self._compact()
+
+        logger.debug("Flushed %d entries to SSTable %s", len(entries), sstable.table_id)
+
+    def _maybe_schedule_compaction(self):
+        """Queue a compaction for the background worker if the threshold is met"""
+        with self.lock:
+            if (len(self.sstable_manager.get_sstables()) >= self.compaction_threshold
+                    and not self._compaction_pending):
+                self._compaction_pending = True
+                self._compaction_queue.put(True)
+
+    def _compaction_worker(self):
+        """Background worker: compacts SSTables when the threshold is reached"""
+        while True:
+            self._compaction_queue.get()
+            try:
+                with self.lock:
+                    self._compaction_pending = False
+                    self._compact()
+            except Exception:
+                # Compaction is an optimization; log and keep the worker
+                # alive so the next threshold crossing can retry it
+                logger.exception("Compaction failed")
+            finally:
+                self._compaction_queue.task_done()
     
     def _compact(self):
-        """Perform compaction of SSTables"""
+        """Perform compaction of SSTables; self.lock must already be held"""
         sstables = self.sstable_manager.get_sstables()
         
         if len(sstables) < 2:
             return
         
-        print(f"Starting compaction of {len(sstables)} SSTables...")
+        logger.debug("Starting compaction of %d SSTables...", len(sstables))
         
         # Simple strategy: merge oldest SSTables first
         # In a production system, you might use more sophisticated strategies
@@ -228,65 +520,116 @@ class LSMTree:
         merged_table = self.sstable_manager.merge_sstables(tables_to_merge)
         
         if merged_table:
-            print(f"Compacted {len(tables_to_merge)} SSTables into {merged_table.table_id}")
-        
+            logger.debug("Compacted %d SSTables into %s", len(tables_to_merge), merged_table.table_id)
+
         # Clean up empty tables
         self.sstable_manager.cleanup_empty_tables()
+
+        # Recompute the live-key counter so any drift self-heals
+        self._active_count = len(self._get_all_keys_locked())
+
+    def active_key_count(self) -> int:
+        """Get the number of live keys in O(1)"""
+        return self._active_count
     
     def force_flush(self):
-        """Force flush memtable to SSTable"""
+        """Force flush memtable to SSTable and wait for it to complete"""
+        done_event = threading.Event()
         with self.lock:
-            self._flush_memtable()
-    
+            self._schedule_flush(done_event)
+        done_event.wait()
+
     def force_compact(self):
         """Force compaction of all SSTables"""
         with self.lock:
             self._compact()
+
+    def wait_for_background_work(self):
+        """Block until all queued flushes and compactions have finished"""
+        self._flush_queue.join()
+        self._compaction_queue.join()
     
     def get_all_keys(self) -> List[str]:
         """Get all active keys in the LSM tree"""
         with self.lock:
-            keys = set()
-            
-            # Get keys from memtable
-            for key, entry in self.memtable.data.items():
-                if not entry['deleted']:
-                    keys.add(key)
-                else:
-                    keys.discard(key)  # Remove if marked as deleted
-            
-            # Get keys from SSTables (newest to oldest)
-            sstables = self.sstable_manager.get_sstables()
-            processed_keys = set()
-            
-            for sstable in reversed(sstables):
-                for entry in sstable.get_all_entries():
-                    if entry.key not in processed_keys:
-                        if entry.deleted:
-                            keys.discard(entry.key)
-                        else:
-                            keys.add(entry.key)
-                        processed_keys.add(entry.key)
-            
-            return sorted(list(keys))
+            return self._get_all_keys_locked()
+
+    def _get_all_keys_locked(self) -> List[str]:
+        """Collect all active keys; self.lock must already be held"""
+        # Every source iterates in key order, so one k-way merge tagged by
+        # seniority (newest source first) produces sorted output directly:
+        # the first record seen for each key is its newest version and
+        # decides liveness, with no set bookkeeping or final sort
+        def tagged(records, seniority):
+            for key, deleted in records:
+                yield key, seniority, deleted
+
+        sources = [((key, deleted) for key, _, deleted
+                    in self.memtable.iter_entries())]
+        for immutable in reversed(self.immutable_memtables):
+            sources.append((key, deleted) for key, _, deleted
+                           in immutable.iter_entries())
+        for sstable in reversed(self.sstable_manager.get_sstables()):
+            sources.append((entry.key, entry.deleted)
+                           for entry in sstable.iter_entries())
+
+        keys = []
+        last_key = None
+        for key, _, deleted in heapq.merge(
+                *(tagged(records, seniority)
+                  for seniority, records in enumerate(sources))):
+            if key == last_key:
+                continue  # An older version of a key already resolved
+            last_key = key
+            if not deleted:
+                keys.append(key)
+        return keys
     
-    def get_range(self, start_key: str = None, end_key: str = None) -> Dict[str, Any]:
-        """Get all key-value pairs in a range"""
+    def iter_range(self, start_key: str = None, end_key: str = None) -> Iterator[Tuple[str, Any]]:
+        """
+        Lazily yield (key, value) pairs in sorted key order for the range
+        [start_key, end_key). Snapshots the memtable and SSTables under the
+        lock, then drives a heap-based merge across all sources (newest
+        first) so each key is resolved once, tombstones are skipped, and
+        memory stays O(sources) instead of O(result). Preferred over
+        get_range for large scans.
+        """
         with self.lock:
-            result = {}
-            all_keys = self.get_all_keys()
-            
-            for key in all_keys:
-                if start_key and key < start_key:
+            # Snapshot all sorted sources, newest first: active memtable,
+            # immutable memtables, then SSTables from newest to oldest
+            sources = [self.memtable.get_range_entries(start_key, end_key)]
+            for immutable in reversed(self.immutable_memtables):
+                sources.append(immutable.get_range_entries(start_key, end_key))
+            for sstable in reversed(self.sstable_manager.get_sstables()):
+                # Skip tables whose key span can't intersect the query range
+                if not sstable.overlaps_range(start_key, end_key):
                     continue
-                if end_key and key >= end_key:
-                    break
-                
-                value = self.get(key)
-                if value is not None:
-                    result[key] = value
-            
-            return result
+                sources.append(sstable.iter_entries())
+
+        # Merge outside the lock; (key, seniority) ordering means the most
+        # recent version of each key is seen first
+        def tagged(entries, seniority):
+            for entry in entries:
+                yield entry.key, seniority, entry
+
+        iterators = [tagged(entries, seniority)
+                     for seniority, entries in enumerate(sources)]
+
+        last_key = None
+        for key, _, entry in heapq.merge(*iterators):
+            if start_key is not None and key < start_key:
+                continue
+            if end_key is not None and key >= end_key:
+                break
+            if key == last_key:
+                continue  # An older version of a key already resolved
+            last_key = key
+            if not entry.deleted:
+                yield key, entry.value
+
+    def get_range(self, start_key: str = None, end_key: str = None) -> Dict[str, Any]:
+        """Get all key-value pairs in a range (materialized; see iter_range)"""
+        return dict(self.iter_range(start_key, end_key))
     
     def get_stats(self) -> Dict:
         """Get comprehensive statistics about the LSM tree"""
@@ -294,18 +637,19 @@ class LSMTree:
             sstables = self.sstable_manager.get_sstables()
             wal_stats = self.wal.get_stats()
             
-            # Calculate total entries across all SSTables
+            # Per-table counters are maintained incrementally, so this is
+            # O(tables) rather than a scan of every entry
             total_sstable_entries = sum(table.size() for table in sstables)
             active_sstable_entries = sum(
-                sum(1 for e in table.get_all_entries() if not e.deleted)
-                for table in sstables
+                table.active_entry_count() for table in sstables
             )
             
             return {
                 'memtable': {
                     'size': self.memtable.size(),
                     'max_size': Memtable.MAX_SIZE,
-                    'is_full': self.memtable.is_full()
+                    'is_full': self.memtable.is_full(),
+                    'immutable_count': len(self.immutable_memtables)
                 },
                 'sstables': {
                     'count': len(sstables),
@@ -314,22 +658,28 @@ class LSMTree:
                     'details': [table.get_stats() for table in sstables]
                 },
                 'wal': wal_stats,
-                'total_active_keys': len(self.get_all_keys()),
+                'total_active_keys': self._active_count,
                 'compaction_threshold': self.compaction_threshold
             }
     
     def clear_all_data(self):
         """Clear all data (use with caution)"""
+        # Let in-flight flushes/compactions finish so they can't recreate
+        # files after we delete them
+        self.wait_for_background_work()
+
         with self.lock:
             # Clear memtable
             self.memtable.clear()
+            self.immutable_memtables.clear()
             
             # Remove all SSTables
             for sstable in self.sstable_manager.get_sstables():
                 sstable.delete_file()
-            self.sstable_manager.sstables.clear()
+            self.sstable_manager.clear()
             
             # Clear WAL
             self.wal.clear()
-            
-            print("All data cleared")
+
+            self._active_count = 0
+            logger.info("All data cleared")
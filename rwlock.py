@@ -0,0 +1,70 @@
+import threading
+from contextlib import contextmanager
+
+
+class ReadWriteLock:
+    """
+    Writer-preferring reader-writer lock.
+    Any number of readers may hold the lock concurrently; writers get
+    exclusive access. A queued writer bars new readers, so sustained
+    overlapping reads cannot starve writes — at the cost that a steady
+    stream of writers delays readers, which fits this store's
+    short-write/long-read profile.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writers_waiting = 0
+        self._writer_active = False
+
+    def acquire_read(self):
+        """Acquire the lock for reading (shared)"""
+        with self._cond:
+            # Waiting while a writer is queued (not just active) gives
+            # writers a bounded path through continuous read traffic
+            while self._writer_active or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self):
+        """Release a read hold"""
+        with self._cond:
+            self._readers -= 1
+            if self._readers == 0:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        """Acquire the lock for writing (exclusive)"""
+        with self._cond:
+            self._writers_waiting += 1
+            try:
+                while self._writer_active or self._readers > 0:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer_active = True
+
+    def release_write(self):
+        """Release the write hold"""
+        with self._cond:
+            self._writer_active = False
+            self._cond.notify_all()
+
+    @contextmanager
+    def read_locked(self):
+        """Context manager for shared (read) access"""
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write_locked(self):
+        """Context manager for exclusive (write) access"""
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
@@ -0,0 +1,39 @@
+"""
+Fast serialization helpers shared by the WAL and SSTable modules.
+Uses orjson (a C-implemented JSON encoder, several times faster than the
+stdlib) when available and falls back to the stdlib json module otherwise.
+The on-disk format stays plain JSON either way, so files written before
+this module existed remain readable.
+"""
+
+try:
+    import orjson
+
+    def dumps(obj, default=None) -> str:
+        """Serialize an object to a JSON string"""
+        return orjson.dumps(obj, default=default).decode('utf-8')
+
+    def dumps_bytes(obj, default=None) -> bytes:
+        """Serialize an object to JSON bytes"""
+        return orjson.dumps(obj, default=default)
+
+    def loads(data):
+        """Deserialize a JSON string or bytes"""
+        return orjson.loads(data)
+
+except ImportError:
+    import json
+
+    def dumps(obj, default=None) -> str:
+        """Serialize an object to a JSON string"""
+        return json.dumps(obj, default=default)
+
+    def dumps_bytes(obj, default=None) -> bytes:
+        """Serialize an object to JSON bytes"""
+        return json.dumps(obj, default=default).encode('utf-8')
+
+    def loads(data):
+        """Deserialize a JSON string or bytes"""
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        return json.loads(data)
@@ -1,24 +1,87 @@
-import json
+import bisect
+import hashlib
+import heapq
+import math
+import mmap
 import os
 import threading
+import time
+from operator import attrgetter
 from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime
 
+import serialization
+
+
+def _epoch_ns(value) -> int:
+    """
+    Normalize a stored timestamp to integer epoch nanoseconds.
+    Accepts int nanoseconds (current format), float epoch seconds, or
+    ISO-8601 strings from files written by older versions.
+    """
+    if isinstance(value, str):
+        return int(datetime.fromisoformat(value).timestamp() * 1_000_000_000)
+    if value < 1_000_000_000_000:  # Epoch seconds rather than nanoseconds
+        return int(value * 1_000_000_000)
+    return int(value)
+
+
+class BloomFilter:
+    """
+    Bloom filter for fast negative lookups.
+    A membership check touches k bits instead of searching the table, so
+    SSTables that can't contain a key are skipped without any entry scan.
+    False positives are possible (default ~1%), false negatives are not.
+    """
+
+    def __init__(self, expected_entries: int, false_positive_rate: float = 0.01):
+        expected_entries = max(expected_entries, 1)
+        # Standard sizing: m = -n*ln(p) / (ln 2)^2, k = (m/n) * ln 2
+        num_bits = math.ceil(-expected_entries * math.log(false_positive_rate) / (math.log(2) ** 2))
+        self.num_bits = max(num_bits, 8)
+        self.num_hashes = max(round((self.num_bits / expected_entries) * math.log(2)), 1)
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def _bit_positions(self, key: str):
+        """Derive k bit positions from a key via double hashing"""
+        digest = hashlib.md5(key.encode('utf-8')).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1  # Odd so probes cycle
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key: str):
+        """Add a key to the filter"""
+        for position in self._bit_positions(key):
+            self.bits[position // 8] |= 1 << (position % 8)
+
+    def may_contain(self, key: str) -> bool:
+        """Check membership; False means the key is definitely absent"""
+        for position in self._bit_positions(key):
+            if not self.bits[position // 8] & (1 << (position % 8)):
+                return False
+        return True
+
 
 class SSTableEntry:
     """Represents a single entry in an SSTable"""
-    
-    def __init__(self, key: str, value: Any, timestamp: datetime = None, deleted: bool = False):
+
+    # Fixed slots: entries are allocated in bulk during flush and
+    # compaction, and dropping the per-instance __dict__ shrinks them
+    __slots__ = ('key', 'value', 'timestamp', 'deleted')
+
+    def __init__(self, key: str, value: Any, timestamp: int = None, deleted: bool = False):
         self.key = key
         self.value = value
-        self.timestamp = timestamp or datetime.now()
+        # Epoch nanoseconds: one cheap clock read, no datetime allocation
+        self.timestamp = time.time_ns() if timestamp is None else timestamp
         self.deleted = deleted
     
     def to_dict(self) -> Dict:
         return {
             'key': self.key,
             'value': self.value,
-            'timestamp': self.timestamp.isoformat(),
+            'timestamp': self.timestamp,
             'deleted': self.deleted
         }
     
@@ -27,10 +90,18 @@ class SSTableEntry:
         return cls(
             data['key'],
             data['value'],
-            datetime.fromisoformat(data['timestamp']),
+            _epoch_ns(data['timestamp']),
             data.get('deleted', False)
         )
 
+    def to_row(self) -> List:
+        """Compact on-disk form: [key, value, epoch_nanoseconds, deleted]"""
+        return [self.key, self.value, self.timestamp, self.deleted]
+
+    @classmethod
+    def from_row(cls, row: List) -> 'SSTableEntry':
+        return cls(row[0], row[1], _epoch_ns(row[2]), row[3])
+
 
 class SSTable:
     """
@@ -40,42 +111,125 @@ class SSTable:
     
     MAX_SIZE = 30  # Maximum number of entries per SSTable
     
-    def __init__(self, table_id: str, file_path: str = None):
+    def __init__(self, table_id: str, file_path: str = None,
+                 entries: List[SSTableEntry] = None):
         self.table_id = table_id
         self.file_path = file_path or f"sstable_{table_id}.sst"
         self.entries: List[SSTableEntry] = []
-        self.lock = threading.RLock()
-        self._load_from_file()
+        self._keys: List[str] = []  # Sorted key array for bisect lookups
+        self.bloom = BloomFilter(self.MAX_SIZE)
+        # Plain Lock (not RLock): helpers like _merge_pending and
+        # _binary_search assume the lock is held rather than re-acquiring
+        self.lock = threading.Lock()
+        self._dirty = False  # In-memory mutations not yet written to disk
+        # Buffered writes awaiting a merge into the sorted entries list;
+        # appends are O(1) and the sort cost is paid once per read/flush
+        self._pending: List[SSTableEntry] = []
+        self._pending_keys = set()
+        self._unique_keys = 0  # Distinct keys across entries + pending
+        self.active_count = 0  # Live entries, maintained so stats stay O(1)
+        self.deleted_count = 0
+        if entries is not None:
+            # Prefilled by the manager (new or compacted table): no file
+            # exists yet, so skip the disk probe and load branch entirely
+            self.entries = entries
+            self._sort_entries()
+            self._rebuild_bloom()
+            self._unique_keys = len(self.entries)
+        else:
+            self._load_from_file()
     
     def _load_from_file(self):
         """Load SSTable from file if it exists"""
-        if os.path.exists(self.file_path):
-            try:
-                with open(self.file_path, 'r') as f:
-                    data = json.load(f)
-                    self.entries = [SSTableEntry.from_dict(entry_data) for entry_data in data.get('entries', [])]
-                    self._sort_entries()
-            except (json.JSONDecodeError, IOError):
-                self.entries = []
+        if not os.path.exists(self.file_path):
+            return
+
+        try:
+            with open(self.file_path, 'rb') as f:
+                if os.path.getsize(self.file_path) == 0:
+                    return
+
+                # Memory-map the file and parse straight from the page
+                # cache: no read() syscall and no userspace copy of the
+                # file bytes before decoding
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    if hasattr(mm, 'madvise'):
+                        mm.madvise(mmap.MADV_SEQUENTIAL)
+                    data = serialization.loads(memoryview(mm))
+
+            # Row format is the compact [key, value, epoch, deleted] list;
+            # dict entries from files written by older versions still load
+            self.entries = [
+                SSTableEntry.from_row(entry_data) if isinstance(entry_data, list)
+                else SSTableEntry.from_dict(entry_data)
+                for entry_data in data.get('entries', [])
+            ]
+            self._sort_entries()
+            self._rebuild_bloom()
+            self._unique_keys = len(self.entries)
+        except (ValueError, IOError):
+            self.entries = []
     
+    def _rebuild_bloom(self):
+        """Rebuild the bloom filter from the current entries"""
+        bloom = BloomFilter(max(len(self.entries), self.MAX_SIZE))
+        for entry in self.entries:
+            bloom.add(entry.key)
+        self.bloom = bloom
+
+    def _rebuild_key_index(self):
+        """Rebuild the sorted key array and the active/deleted counters"""
+        self._keys = [entry.key for entry in self.entries]
+        self.deleted_count = sum(1 for entry in self.entries if entry.deleted)
+        self.active_count = len(self.entries) - self.deleted_count
+
+    def _merge_pending(self):
+        """
+        Fold buffered writes into the sorted entries list (newest version of
+        each key wins). Called lazily from read and flush paths so a batch
+        of O(1) appends pays for one sort instead of one insert each.
+        """
+        if not self._pending:
+            return
+        merged = {entry.key: entry for entry in self.entries}
+        for entry in self._pending:  # Arrival order, so later writes win
+            merged[entry.key] = entry
+        self._pending.clear()
+        self._pending_keys.clear()
+        self.entries = [merged[key] for key in sorted(merged)]
+        self._unique_keys = len(self.entries)
+        self._rebuild_key_index()
+
     def _save_to_file(self):
         """Save SSTable to file"""
         with self.lock:
+            # Entries are final at save time; refresh the filter and key
+            # index so reads can use them
+            self._merge_pending()
+            self._rebuild_bloom()
+            self._rebuild_key_index()
+            self._unique_keys = len(self.entries)
             data = {
                 'table_id': self.table_id,
-                'entries': [entry.to_dict() for entry in self.entries],
+                'entries': [entry.to_row() for entry in self.entries],
                 'created_at': datetime.now().isoformat()
             }
             
+            payload = serialization.dumps_bytes(data)
             temp_file = self.file_path + '.tmp'
             try:
-                with open(temp_file, 'w') as f:
-                    json.dump(data, f, indent=2)
-                    f.flush()
-                    os.fsync(f.fileno())
-                
+                # Raw fd, pre-serialized payload: one write syscall plus
+                # the fsync, with no buffered-file layer in between
+                fd = os.open(temp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+                try:
+                    os.write(fd, payload)
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+
                 # Atomic replace
                 os.replace(temp_file, self.file_path)
+                self._dirty = False
             except IOError:
                 if os.path.exists(temp_file):
                     os.remove(temp_file)
@@ -84,118 +238,194 @@ class SSTable:
     def _sort_entries(self):
         """Sort entries by key"""
         self.entries.sort(key=lambda x: x.key)
+        self._rebuild_key_index()
     
     def _binary_search(self, key: str) -> Tuple[int, bool]:
         """
-        Binary search for key position.
+        Binary search for key position via bisect on the sorted key array.
         Returns (index, found) where index is the position and found indicates if key exists.
         """
-        left, right = 0, len(self.entries)
-        
-        while left < right:
-            mid = (left + right) // 2
-            if self.entries[mid].key < key:
-                left = mid + 1
-            elif self.entries[mid].key > key:
-                right = mid
-            else:
-                return mid, True
-        
-        return left, False
+        if len(self._keys) != len(self.entries):
+            self._rebuild_key_index()
+
+        index = bisect.bisect_left(self._keys, key)
+        return index, index < len(self._keys) and self._keys[index] == key
     
-    def put(self, key: str, value: Any, timestamp: datetime = None) -> bool:
+    def put(self, key: str, value: Any, timestamp: int = None) -> bool:
         """
         Add or update a key-value pair in the SSTable.
         Returns True if successful, False if SSTable is full and key doesn't exist.
         """
         with self.lock:
-            timestamp = timestamp or datetime.now()
-            index, found = self._binary_search(key)
-            
-            if found:
-                # Update existing entry
-                self.entries[index] = SSTableEntry(key, value, timestamp, False)
-            else:
-                # Add new entry
-                if len(self.entries) >= self.MAX_SIZE:
+            if timestamp is None:
+                timestamp = time.time_ns()
+            found = key in self._pending_keys or self._binary_search(key)[1]
+
+            if not found:
+                if self._unique_keys >= self.MAX_SIZE:
                     return False  # SSTable is full
-                
-                self.entries.insert(index, SSTableEntry(key, value, timestamp, False))
-            
-            self._save_to_file()
+                self._unique_keys += 1
+                self.bloom.add(key)
+
+            # O(1) append; the sorted merge happens lazily on read/flush
+            self._pending.append(SSTableEntry(key, value, timestamp, False))
+            self._pending_keys.add(key)
+
+            # Mark dirty instead of rewriting the file per mutation; one
+            # flush_to_disk() call persists the whole batch
+            self._dirty = True
             return True
     
+    @property
+    def min_key(self) -> Optional[str]:
+        """Smallest key in the table (None if empty)"""
+        with self.lock:
+            self._merge_pending()
+            return self.entries[0].key if self.entries else None
+
+    @property
+    def max_key(self) -> Optional[str]:
+        """Largest key in the table (None if empty)"""
+        with self.lock:
+            self._merge_pending()
+            return self.entries[-1].key if self.entries else None
+
+    def key_in_range(self, key: str) -> bool:
+        """Check whether a key falls within this table's [min, max] span"""
+        with self.lock:
+            self._merge_pending()
+            if not self.entries:
+                return False
+            return self.entries[0].key <= key <= self.entries[-1].key
+
+    def overlaps_range(self, start_key: str = None, end_key: str = None) -> bool:
+        """Check whether this table's key span overlaps [start_key, end_key)"""
+        if self.size() == 0:
+            return False
+        if start_key is not None and self.max_key < start_key:
+            return False
+        if end_key is not None and self.min_key >= end_key:
+            return False
+        return True
+
+    def may_contain(self, key: str) -> bool:
+        """Bloom-filter membership check; False means definitely absent"""
+        return self.bloom.may_contain(key)
+
     def get(self, key: str) -> Optional[Any]:
         """Get value by key. Returns None if key doesn't exist or is deleted."""
         with self.lock:
+            if not self.bloom.may_contain(key):
+                return None
+            self._merge_pending()
             index, found = self._binary_search(key)
             if found and not self.entries[index].deleted:
                 return self.entries[index].value
             return None
-    
-    def delete(self, key: str, timestamp: datetime = None) -> bool:
+
+    def get_with_tombstone(self, key: str) -> Tuple[Optional[Any], bool]:
+        """
+        Get (value, found) for a key in one binary search, where a tombstone
+        counts as found with value None. Lets readers stop at the newest
+        version of a key without rescanning the table for tombstones.
+        """
+        with self.lock:
+            if not self.bloom.may_contain(key):
+                return None, False
+            self._merge_pending()
+            index, found = self._binary_search(key)
+            if not found:
+                return None, False
+            entry = self.entries[index]
+            return (None, True) if entry.deleted else (entry.value, True)
+
+    def delete(self, key: str, timestamp: int = None) -> bool:
         """
         Mark a key as deleted (tombstone).
         Returns True if key was found, False otherwise.
         """
         with self.lock:
-            timestamp = timestamp or datetime.now()
-            index, found = self._binary_search(key)
-            
+            if timestamp is None:
+                timestamp = time.time_ns()
+            found = key in self._pending_keys or self._binary_search(key)[1]
+
             if found:
-                self.entries[index] = SSTableEntry(key, None, timestamp, True)
-                self._save_to_file()
+                self._pending.append(SSTableEntry(key, None, timestamp, True))
+                self._pending_keys.add(key)
+                self._dirty = True
                 return True
             else:
                 # Add tombstone even if key doesn't exist to handle deletions
                 # from other SSTables during compaction
-                if len(self.entries) < self.MAX_SIZE:
-                    self.entries.insert(index, SSTableEntry(key, None, timestamp, True))
-                    self._save_to_file()
+                if self._unique_keys < self.MAX_SIZE:
+                    self._unique_keys += 1
+                    self.bloom.add(key)
+                    self._pending.append(SSTableEntry(key, None, timestamp, True))
+                    self._pending_keys.add(key)
+                    self._dirty = True
                 return False
     
+    def flush_to_disk(self):
+        """Persist pending mutations with one write+fsync (no-op when clean)"""
+        if self._dirty:
+            self._save_to_file()
+
     def get_all_entries(self) -> List[SSTableEntry]:
         """Get all entries in the SSTable"""
         with self.lock:
+            self._merge_pending()
             return self.entries.copy()
-    
+
+    def iter_entries(self):
+        """
+        Iterate entries in sorted order without copying the list. Merges
+        grab the current list reference under the lock; later mutations
+        swap in a new list, so in-flight iterators keep a stable snapshot.
+        """
+        with self.lock:
+            self._merge_pending()
+            entries = self.entries
+        return iter(entries)
+
     def get_range(self, start_key: str = None, end_key: str = None) -> List[SSTableEntry]:
         """Get entries in a key range [start_key, end_key)"""
         with self.lock:
-            result = []
-            
-            for entry in self.entries:
-                if start_key and entry.key < start_key:
-                    continue
-                if end_key and entry.key >= end_key:
-                    break
-                result.append(entry)
-            
-            return result
+            self._merge_pending()
+            # Entries are sorted, so bisect both bounds and slice instead
+            # of scanning the whole table
+            start_idx = bisect.bisect_left(self._keys, start_key) if start_key else 0
+            end_idx = bisect.bisect_left(self._keys, end_key) if end_key else len(self.entries)
+            return self.entries[start_idx:end_idx]
     
     def is_full(self) -> bool:
         """Check if SSTable has reached maximum capacity"""
-        return len(self.entries) >= self.MAX_SIZE
-    
+        return self._unique_keys >= self.MAX_SIZE
+
     def is_empty(self) -> bool:
         """Check if SSTable is empty"""
-        return len(self.entries) == 0
-    
+        return self.size() == 0
+
     def size(self) -> int:
         """Get number of entries in SSTable"""
-        return len(self.entries)
-    
+        with self.lock:
+            self._merge_pending()
+            return len(self.entries)
+
+    def active_entry_count(self) -> int:
+        """Number of live (non-tombstone) entries, from the maintained counter"""
+        with self.lock:
+            self._merge_pending()
+            return self.active_count
+
     def get_stats(self) -> Dict:
-        """Get SSTable statistics"""
+        """Get SSTable statistics from the maintained counters"""
         with self.lock:
-            active_entries = sum(1 for e in self.entries if not e.deleted)
-            deleted_entries = sum(1 for e in self.entries if e.deleted)
-            
+            self._merge_pending()
             return {
                 'table_id': self.table_id,
                 'total_entries': len(self.entries),
-                'active_entries': active_entries,
-                'deleted_entries': deleted_entries,
+                'active_entries': self.active_count,
+                'deleted_entries': self.deleted_count,
                 'is_full': self.is_full(),
                 'file_size': os.path.getsize(self.file_path) if os.path.exists(self.file_path) else 0
             }
@@ -206,8 +436,9 @@ class SSTable:
         Returns a new SSTable with only active entries.
         """
         with self.lock:
+            self._merge_pending()
             compacted_table = SSTable(f"{self.table_id}_compacted")
-            
+
             for entry in self.entries:
                 if not entry.deleted:
                     compacted_table.entries.append(entry)
@@ -227,12 +458,16 @@ class SSTableManager:
     def __init__(self, data_dir: str = "data"):
         self.data_dir = data_dir
         self.sstables: List[SSTable] = []
+        # Copy-on-write snapshot: writers rebuild this tuple under the
+        # lock, readers just grab the reference (atomic in CPython)
+        self._snapshot: Tuple[SSTable, ...] = ()
         self.table_counter = 0
-        self.lock = threading.RLock()
-        
+        self.lock = threading.Lock()
+
         # Create data directory if it doesn't exist
         os.makedirs(data_dir, exist_ok=True)
         self._load_existing_tables()
+        self._refresh_snapshot()
     
     def _load_existing_tables(self):
         """Load existing SSTables from data directory"""
@@ -251,16 +486,26 @@ class SSTableManager:
                     except (ValueError, IndexError):
                         pass
     
-    def create_sstable(self) -> SSTable:
-        """Create a new SSTable"""
+    def _refresh_snapshot(self):
+        """Rebuild the read-only snapshot after a table-set mutation"""
+        self._snapshot = tuple(self.sstables)
+
+    def create_sstable(self, entries: List[SSTableEntry] = None) -> SSTable:
+        """Create a new SSTable, optionally prefilled with entries"""
         with self.lock:
-            self.table_counter += 1
-            table_id = f"table_{self.table_counter}"
-            file_path = os.path.join(self.data_dir, f"{table_id}.sst")
-            
-            sstable = SSTable(table_id, file_path)
-            self.sstables.append(sstable)
-            return sstable
+            return self._create_sstable_locked(entries)
+
+    def _create_sstable_locked(self, entries: List[SSTableEntry] = None) -> SSTable:
+        """Create a table assuming self.lock is already held"""
+        self.table_counter += 1
+        table_id = f"table_{self.table_counter}"
+        file_path = os.path.join(self.data_dir, f"{table_id}.sst")
+
+        sstable = SSTable(table_id, file_path,
+                          entries=entries if entries is not None else [])
+        self.sstables.append(sstable)
+        self._refresh_snapshot()
+        return sstable
     
     def merge_sstables(self, tables: List[SSTable]) -> SSTable:
         """
@@ -271,30 +516,29 @@ class SSTableManager:
             return None
         
         with self.lock:
-            # Create new merged table
-            merged_table = self.create_sstable()
-            
-            # Collect all entries from all tables
-            all_entries = []
-            for table in tables:
-                all_entries.extend(table.get_all_entries())
-            
-            # Sort by key, then by timestamp (most recent last)
-            all_entries.sort(key=lambda x: (x.key, x.timestamp))
-            
-            # Keep only the most recent entry for each key
-            merged_entries = {}
-            for entry in all_entries:
-                if (entry.key not in merged_entries or 
-                    entry.timestamp > merged_entries[entry.key].timestamp):
-                    merged_entries[entry.key] = entry
-            
-            # Add non-deleted entries to merged table
-            for key in sorted(merged_entries.keys()):
-                entry = merged_entries[key]
-                if not entry.deleted:
-                    merged_table.entries.append(entry)
-            
+            # Each table is already sorted by unique keys, so a k-way heap
+            # merge ordered by (key, timestamp) replaces the global sort:
+            # O(N log k) with no intermediate dict or second sort pass
+            merged_stream = heapq.merge(
+                *[table.iter_entries() for table in tables],
+                key=attrgetter('key', 'timestamp')
+            )
+
+            # Within each run of equal keys the last entry has the newest
+            # timestamp; emit an entry when the key changes
+            merged_entries = []
+            prev_entry = None
+            for entry in merged_stream:
+                if prev_entry is not None and entry.key != prev_entry.key:
+                    if not prev_entry.deleted:
+                        merged_entries.append(prev_entry)
+                prev_entry = entry
+            if prev_entry is not None and not prev_entry.deleted:
+                merged_entries.append(prev_entry)
+
+            # Build the merged table prefilled with the final entries: no
+            # empty-file load roundtrip, one save with the complete list
+            merged_table = self._create_sstable_locked(merged_entries)
             merged_table._save_to_file()
             
             # Remove old tables
@@ -302,14 +546,20 @@ class SSTableManager:
                 if table in self.sstables:
                     self.sstables.remove(table)
                     table.delete_file()
-            
+            self._refresh_snapshot()
+
             return merged_table
     
-    def get_sstables(self) -> List[SSTable]:
-        """Get all SSTables"""
+    def get_sstables(self) -> Tuple[SSTable, ...]:
+        """Get the current immutable snapshot of SSTables (no copy)"""
+        return self._snapshot
+
+    def clear(self):
+        """Remove all SSTables from the manager (files are left to callers)"""
         with self.lock:
-            return self.sstables.copy()
-    
+            self.sstables.clear()
+            self._refresh_snapshot()
+
     def cleanup_empty_tables(self):
         """Remove empty SSTables"""
         with self.lock:
@@ -317,3 +567,5 @@ class SSTableManager:
             for table in empty_tables:
                 self.sstables.remove(table)
                 table.delete_file()
+            if empty_tables:
+                self._refresh_snapshot()
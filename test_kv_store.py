@@ -2,20 +2,32 @@ import unittest
 import os
 import shutil
 import tempfile
+import threading
+import time
 from datetime import datetime
 from typing import Dict, Any
 
 from kv_store import KeyValueStore, create_kv_store
 from lsm_tree import LSMTree, Memtable
+from rwlock import ReadWriteLock
 from sstable import SSTable, SSTableManager
 from wal import WriteAheadLog, WALOperation
 
+# Back test directories with tmpfs where available so the suite
+# exercises the logic rather than the disk
+_TMPFS = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+
+def make_test_dir() -> str:
+    """Create a temp directory, preferring a memory-backed filesystem"""
+    return tempfile.mkdtemp(dir=_TMPFS)
+
 
 class TestWriteAheadLog(unittest.TestCase):
     """Test Write-Ahead Log functionality"""
     
     def setUp(self):
-        self.test_dir = tempfile.mkdtemp()
+        self.test_dir = make_test_dir()
         self.wal_file = os.path.join(self.test_dir, "test_wal.log")
         self.wal = WriteAheadLog(self.wal_file)
     
@@ -64,12 +76,166 @@ class TestWriteAheadLog(unittest.TestCase):
         self.assertEqual(len(entries), 3)  # Should keep sequences 3, 4, 5
         self.assertEqual(entries[0].sequence_number, 3)
 
+    def test_concurrent_writers_share_group_commit(self):
+        """Test that concurrent synced writes all land with unique sequences"""
+        def writer(worker_id):
+            for i in range(5):
+                self.wal.log_operation(WALOperation.PUT, f"w{worker_id}_k{i}", i)
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        entries = self.wal.get_all_entries()
+        self.assertEqual(len(entries), 20)
+        sequences = [entry.sequence_number for entry in entries]
+        self.assertEqual(len(set(sequences)), 20)
+        self.assertEqual(self.wal.sequence_counter, 20)
+
+    def test_checksum_rejects_corrupt_record(self):
+        """Test that a corrupted WAL record is skipped on replay"""
+        self.wal.log_operation(WALOperation.PUT, "key1", "value1")
+        self.wal.log_operation(WALOperation.PUT, "key2", "value2")
+
+        # Corrupt the payload of the last record without touching its checksum
+        with open(self.wal_file, 'rb') as f:
+            lines = f.read().splitlines()
+        lines[-1] = lines[-1].replace(b'value2', b'valueX')
+        with open(self.wal_file, 'wb') as f:
+            f.write(b'\n'.join(lines) + b'\n')
+
+        entries = self.wal.get_all_entries()
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0].key, "key1")
+
+    def test_checksum_isolates_corruption_to_one_record(self):
+        """Test that corruption in the middle leaves other records intact"""
+        for i in range(3):
+            self.wal.log_operation(WALOperation.PUT, f"key{i}", f"value{i}")
+
+        with open(self.wal_file, 'rb') as f:
+            lines = f.read().splitlines()
+        lines[1] = lines[1].replace(b'value1', b'valueX')
+        with open(self.wal_file, 'wb') as f:
+            f.write(b'\n'.join(lines) + b'\n')
+
+        entries = WriteAheadLog(self.wal_file).get_all_entries()
+        self.assertEqual([entry.key for entry in entries], ["key0", "key2"])
+
+    def test_sync_failure_reaches_the_writer(self):
+        """A failed WAL write surfaces to sync callers instead of passing"""
+        self.wal.log_operation(WALOperation.PUT, "key1", "value1")
+        os.close(self.wal._write_fd)  # Make the next flush fail
+
+        with self.assertRaises(OSError):
+            self.wal.log_operation(WALOperation.PUT, "key2", "value2")
+
+        # Reopen a valid descriptor so tearDown's cleanup doesn't trip
+        self.wal._write_fd = os.open(self.wal_file, os.O_WRONLY | os.O_APPEND)
+
+    def test_timestamps_are_epoch_integers(self):
+        """Timestamps are epoch-ns ints and survive a reopen unchanged"""
+        self.wal.log_operation(WALOperation.PUT, "key1", "value1")
+        original = self.wal.get_all_entries()[0]
+        self.assertIsInstance(original.timestamp, int)
+
+        reopened = WriteAheadLog(self.wal_file)
+        self.assertEqual(reopened.get_all_entries()[0].timestamp,
+                         original.timestamp)
+
+    def test_stats_counters_track_operations(self):
+        """Test that stats counters stay accurate without rescanning"""
+        for i in range(4):
+            self.wal.log_operation(WALOperation.PUT, f"key{i}", f"value{i}")
+        self.wal.log_operation(WALOperation.DELETE, "key0")
+
+        stats = self.wal.get_stats()
+        self.assertEqual(stats['total_entries'], 5)
+        self.assertEqual(stats['put_operations'], 4)
+        self.assertEqual(stats['delete_operations'], 1)
+
+        self.wal.truncate_before_sequence(4)
+        stats = self.wal.get_stats()
+        self.assertEqual(stats['total_entries'], 2)
+        self.assertEqual(stats['put_operations'], 1)
+        self.assertEqual(stats['delete_operations'], 1)
+
+
+class TestReadWriteLock(unittest.TestCase):
+    """Test reader-writer lock behavior"""
+
+    def setUp(self):
+        self.lock = ReadWriteLock()
+
+    def test_readers_share(self):
+        """Test that multiple readers can hold the lock concurrently"""
+        self.lock.acquire_read()
+        self.lock.acquire_read()  # Should not block
+        self.lock.release_read()
+        self.lock.release_read()
+
+    def test_writer_excludes_readers(self):
+        """Test that a writer blocks until readers release"""
+        import threading
+
+        self.lock.acquire_read()
+        acquired = threading.Event()
+
+        def writer():
+            self.lock.acquire_write()
+            acquired.set()
+            self.lock.release_write()
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+
+        # Writer must wait while the read hold is active
+        self.assertFalse(acquired.wait(timeout=0.05))
+        self.lock.release_read()
+        self.assertTrue(acquired.wait(timeout=1.0))
+        thread.join()
+
+    def test_queued_writer_bars_new_readers(self):
+        """Test that a waiting writer keeps new readers from entering"""
+        import threading
+
+        self.lock.acquire_read()
+        write_acquired = threading.Event()
+        read_acquired = threading.Event()
+
+        def writer():
+            self.lock.acquire_write()
+            write_acquired.set()
+            self.lock.release_write()
+
+        def reader():
+            self.lock.acquire_read()
+            read_acquired.set()
+            self.lock.release_read()
+
+        writer_thread = threading.Thread(target=writer)
+        writer_thread.start()
+        time.sleep(0.05)  # Let the writer queue behind the read hold
+
+        reader_thread = threading.Thread(target=reader)
+        reader_thread.start()
+
+        # The new reader must wait behind the queued writer
+        self.assertFalse(read_acquired.wait(timeout=0.05))
+        self.lock.release_read()
+        self.assertTrue(write_acquired.wait(timeout=1.0))
+        self.assertTrue(read_acquired.wait(timeout=1.0))
+        writer_thread.join()
+        reader_thread.join()
+
 
 class TestSSTable(unittest.TestCase):
     """Test SSTable functionality"""
     
     def setUp(self):
-        self.test_dir = tempfile.mkdtemp()
+        self.test_dir = make_test_dir()
         self.sstable_file = os.path.join(self.test_dir, "test_table.sst")
         self.sstable = SSTable("test_table", self.sstable_file)
     
@@ -132,11 +298,48 @@ class TestSSTable(unittest.TestCase):
         
         self.assertEqual(range_keys, ["b", "c"])  # [b, d) - excludes d
     
+    def test_bloom_filter(self):
+        """Test bloom filter gating for point lookups"""
+        for i in range(10):
+            self.sstable.put(f"key{i}", f"value{i}")
+
+        # No false negatives: every stored key must pass the filter
+        for i in range(10):
+            self.assertTrue(self.sstable.may_contain(f"key{i}"))
+
+        # Most absent keys should be rejected without a search
+        misses = sum(1 for i in range(100) if not self.sstable.may_contain(f"absent{i}"))
+        self.assertGreater(misses, 90)
+
+        # Filter survives reload from disk
+        self.sstable.flush_to_disk()
+        reloaded = SSTable("test_table", self.sstable_file)
+        self.assertTrue(reloaded.may_contain("key1"))
+
+    def test_key_span_metadata(self):
+        """Test min/max key tracking and range-overlap pruning"""
+        self.assertIsNone(self.sstable.min_key)
+        self.assertFalse(self.sstable.key_in_range("anything"))
+
+        for key in ["d", "b", "f"]:
+            self.sstable.put(key, f"value_{key}")
+
+        self.assertEqual(self.sstable.min_key, "b")
+        self.assertEqual(self.sstable.max_key, "f")
+        self.assertTrue(self.sstable.key_in_range("c"))
+        self.assertFalse(self.sstable.key_in_range("a"))
+        self.assertFalse(self.sstable.key_in_range("g"))
+
+        self.assertTrue(self.sstable.overlaps_range("a", "c"))   # Contains b
+        self.assertFalse(self.sstable.overlaps_range("g", None))  # Above max
+        self.assertFalse(self.sstable.overlaps_range(None, "b"))  # Below min (exclusive end)
+
     def test_persistence(self):
         """Test that SSTable persists to disk"""
         self.sstable.put("key1", "value1")
         self.sstable.put("key2", "value2")
-        
+        self.sstable.flush_to_disk()
+
         # Create new SSTable instance (simulating restart)
         new_sstable = SSTable("test_table", self.sstable_file)
         
@@ -144,12 +347,23 @@ class TestSSTable(unittest.TestCase):
         self.assertEqual(new_sstable.get("key2"), "value2")
         self.assertEqual(new_sstable.size(), 2)
 
+    def test_timestamps_persist_as_epoch_integers(self):
+        """Timestamps survive a save/load round trip as epoch-ns ints"""
+        self.sstable.put("key1", "value1")
+        self.sstable.flush_to_disk()
+        original = next(iter(self.sstable.iter_entries()))
+
+        reloaded = SSTable("test_table", self.sstable_file)
+        entry = next(iter(reloaded.iter_entries()))
+        self.assertIsInstance(entry.timestamp, int)
+        self.assertEqual(entry.timestamp, original.timestamp)
+
 
 class TestSSTableManager(unittest.TestCase):
     """Test SSTable Manager functionality"""
     
     def setUp(self):
-        self.test_dir = tempfile.mkdtemp()
+        self.test_dir = make_test_dir()
         self.manager = SSTableManager(self.test_dir)
     
     def tearDown(self):
@@ -238,7 +452,7 @@ class TestLSMTree(unittest.TestCase):
     """Test LSM Tree functionality"""
     
     def setUp(self):
-        self.test_dir = tempfile.mkdtemp()
+        self.test_dir = make_test_dir()
         self.wal_file = os.path.join(self.test_dir, "lsm_wal.log")
         self.lsm_tree = LSMTree(self.test_dir, self.wal_file)
     
@@ -269,7 +483,10 @@ class TestLSMTree(unittest.TestCase):
         # Fill memtable to trigger flush
         for i in range(Memtable.MAX_SIZE + 1):
             self.lsm_tree.put(f"key{i}", f"value{i}")
-        
+
+        # Flushing happens on a background thread now
+        self.lsm_tree.wait_for_background_work()
+
         # Should have created at least one SSTable
         final_sstables = len(self.lsm_tree.sstable_manager.get_sstables())
         self.assertGreater(final_sstables, initial_sstables)
@@ -285,11 +502,76 @@ class TestLSMTree(unittest.TestCase):
         # Create enough data to trigger multiple flushes
         for i in range(Memtable.MAX_SIZE * 3):
             self.lsm_tree.put(f"key{i:04d}", f"value{i}")
-        
+
+        # Flush and compaction run on background threads now
+        self.lsm_tree.wait_for_background_work()
+
         # Should have triggered compaction
         sstables = self.lsm_tree.sstable_manager.get_sstables()
         self.assertLessEqual(len(sstables), 3)  # Compaction should have merged some
     
+    def test_reads_during_background_flush(self):
+        """Test that keys stay readable while a flush is still queued"""
+        for i in range(Memtable.MAX_SIZE + 5):
+            self.lsm_tree.put(f"key{i:04d}", f"value{i}")
+
+        # Without waiting for the flush worker, every key must be visible
+        # via the active or immutable memtables
+        for i in range(Memtable.MAX_SIZE + 5):
+            self.assertEqual(self.lsm_tree.get(f"key{i:04d}"), f"value{i}")
+
+        # And still visible once the flush has landed in an SSTable
+        self.lsm_tree.wait_for_background_work()
+        for i in range(Memtable.MAX_SIZE + 5):
+            self.assertEqual(self.lsm_tree.get(f"key{i:04d}"), f"value{i}")
+
+    def test_put_many(self):
+        """Test batched puts share one WAL append and stay readable"""
+        items = {f"key{i}": f"value{i}" for i in range(5)}
+        results = self.lsm_tree.put_many(items)
+
+        self.assertTrue(all(results.values()))
+        for key, value in items.items():
+            self.assertEqual(self.lsm_tree.get(key), value)
+        self.assertEqual(self.lsm_tree.active_key_count(), 5)
+
+        # All operations must be replayable from the WAL
+        entries = self.lsm_tree.wal.get_all_entries()
+        self.assertEqual(len(entries), 5)
+        self.assertEqual(entries[-1].sequence_number, 5)
+
+    def test_multi_get(self):
+        """Test batched multi-key retrieval"""
+        for i in range(5):
+            self.lsm_tree.put(f"key{i}", f"value{i}")
+
+        # Span memtable and SSTables
+        self.lsm_tree.force_flush()
+        self.lsm_tree.put("key5", "value5")
+        self.lsm_tree.delete("key2")
+
+        results = self.lsm_tree.multi_get(["key0", "key2", "key5", "missing"])
+        self.assertEqual(results["key0"], "value0")
+        self.assertIsNone(results["key2"])  # Deleted
+        self.assertEqual(results["key5"], "value5")
+        self.assertIsNone(results["missing"])
+
+    def test_active_key_count(self):
+        """Test that the live-key counter tracks puts, updates, and deletes"""
+        self.assertEqual(self.lsm_tree.active_key_count(), 0)
+
+        self.lsm_tree.put("key1", "value1")
+        self.lsm_tree.put("key2", "value2")
+        self.lsm_tree.put("key1", "updated")  # Update, not a new key
+        self.assertEqual(self.lsm_tree.active_key_count(), 2)
+
+        self.lsm_tree.force_flush()
+        self.assertEqual(self.lsm_tree.active_key_count(), 2)
+
+        self.lsm_tree.delete("key1")
+        self.lsm_tree.delete("nonexistent")  # Should not decrement
+        self.assertEqual(self.lsm_tree.active_key_count(), 1)
+
     def test_get_all_keys(self):
         """Test getting all keys from LSM tree"""
         keys = ["apple", "banana", "cherry"]
@@ -299,6 +581,17 @@ class TestLSMTree(unittest.TestCase):
         all_keys = self.lsm_tree.get_all_keys()
         self.assertEqual(set(all_keys), set(keys))
     
+    def test_iter_range(self):
+        """Test lazy range iteration yields sorted pairs and skips tombstones"""
+        for key in ["a", "b", "c", "d"]:
+            self.lsm_tree.put(key, f"value_{key}")
+        self.lsm_tree.force_flush()
+        self.lsm_tree.put("b", "updated_b")
+        self.lsm_tree.delete("c")
+
+        pairs = list(self.lsm_tree.iter_range(None, None))
+        self.assertEqual(pairs, [("a", "value_a"), ("b", "updated_b"), ("d", "value_d")])
+
     def test_range_query(self):
         """Test range query across memtable and SSTables"""
         keys = ["a", "b", "c", "d", "e"]
@@ -322,7 +615,7 @@ class TestKeyValueStore(unittest.TestCase):
     """Test Key-Value Store functionality"""
     
     def setUp(self):
-        self.test_dir = tempfile.mkdtemp()
+        self.test_dir = make_test_dir()
         self.kv_store = create_kv_store(
             data_dir=os.path.join(self.test_dir, "data"),
             wal_file=os.path.join(self.test_dir, "wal.log")
@@ -416,12 +709,31 @@ class TestKeyValueStore(unittest.TestCase):
         expected = {"banana": "fruit", "carrot": "vegetable"}
         self.assertEqual(range_result, expected)
         
+        # Test prefix query (bounds computed from the prefix itself)
+        self.kv_store.put("ba:1", "prefixed")
+        self.assertEqual(self.kv_store.get_prefix("ba"),
+                         {"banana": "fruit", "ba:1": "prefixed"})
+        self.assertEqual(self.kv_store.get_prefix("nomatch"), {})
+        self.kv_store.delete("ba:1")
+
         # Test count
         self.assertEqual(self.kv_store.count(), len(test_data))
         
         # Test is_empty
         self.assertFalse(self.kv_store.is_empty())
     
+    def test_get_all_items_across_sstables(self):
+        """Test that get_all_items merges memtable and SSTables in one scan"""
+        self.kv_store.put("a", "1")
+        self.kv_store.put("b", "2")
+        self.kv_store.force_flush()
+        self.kv_store.put("b", "2_updated")
+        self.kv_store.put("c", "3")
+        self.kv_store.delete("a")
+
+        items = self.kv_store.get_all_items()
+        self.assertEqual(items, {"b": "2_updated", "c": "3"})
+
     def test_dict_like_interface(self):
         """Test dictionary-like interface"""
         # Test __setitem__ and __getitem__
@@ -522,7 +834,7 @@ class TestFailoverScenarios(unittest.TestCase):
     """Test fail-over and recovery scenarios"""
     
     def setUp(self):
-        self.test_dir = tempfile.mkdtemp()
+        self.test_dir = make_test_dir()
     
     def tearDown(self):
         shutil.rmtree(self.test_dir)
@@ -567,6 +879,10 @@ class TestFailoverScenarios(unittest.TestCase):
         for i in range(Memtable.MAX_SIZE + 5):
             self.assertEqual(kv_store2.get(f"key{i:04d}"), f"value{i}")
 
+        # Recovery may have queued a background flush; let it finish before
+        # tearDown removes the directory
+        kv_store2.lsm_tree.wait_for_background_work()
+
 
 if __name__ == "__main__":
     # Run all tests
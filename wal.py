@@ -1,9 +1,23 @@
-import json
+import bisect
+import mmap
 import os
 import threading
+import time
 from datetime import datetime
 from enum import Enum
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import serialization
+
+try:
+    from crc32c import crc32c as _checksum  # hardware CRC32C when available
+except ImportError:
+    from zlib import crc32 as _checksum
+
+# fdatasync skips the metadata journal commit that fsync forces; for an
+# append-only log only the data needs to be durable. Not available on
+# all platforms (e.g. macOS), so fall back to fsync.
+_datasync = getattr(os, 'fdatasync', os.fsync)
 
 
 class WALOperation(Enum):
@@ -12,14 +26,25 @@ class WALOperation(Enum):
     DELETE = "DELETE"
 
 
+# Module-level lookup table: a plain dict hit beats the Enum value-map
+# call (__call__ plus _missing_ handling) that replay would otherwise
+# pay per record
+_OP_BY_VALUE = {op.value: op for op in WALOperation}
+
+
 class WALEntry:
     """Represents a single entry in the Write-Ahead Log"""
+
+    # Fixed slots: recovery decodes one instance per record, and dropping
+    # the per-instance __dict__ shrinks each by roughly two thirds
+    __slots__ = ('operation', 'key', 'value', 'timestamp', 'sequence_number')
     
-    def __init__(self, operation: WALOperation, key: str, value: Any = None, timestamp: datetime = None):
+    def __init__(self, operation: WALOperation, key: str, value: Any = None, timestamp: int = None):
         self.operation = operation
         self.key = key
         self.value = value
-        self.timestamp = timestamp or datetime.now()
+        # Epoch nanoseconds: one cheap clock read, no datetime allocation
+        self.timestamp = time.time_ns() if timestamp is None else timestamp
         self.sequence_number = None
     
     def to_dict(self) -> Dict:
@@ -27,21 +52,36 @@ class WALEntry:
             'operation': self.operation.value,
             'key': self.key,
             'value': self.value,
-            'timestamp': self.timestamp.isoformat(),
+            'timestamp': self.timestamp,
             'sequence_number': self.sequence_number
         }
     
     @classmethod
     def from_dict(cls, data: Dict) -> 'WALEntry':
+        timestamp = data['timestamp']
+        if isinstance(timestamp, str):
+            # Records written before epoch timestamps used ISO-8601
+            timestamp = int(datetime.fromisoformat(timestamp).timestamp() * 1_000_000_000)
         entry = cls(
-            WALOperation(data['operation']),
+            _OP_BY_VALUE[data['operation']],
             data['key'],
             data['value'],
-            datetime.fromisoformat(data['timestamp'])
+            timestamp
         )
         entry.sequence_number = data['sequence_number']
         return entry
 
+    def to_row(self) -> List:
+        """Compact on-disk form: [sequence, operation, key, value, epoch_ns]"""
+        return [self.sequence_number, self.operation.value,
+                self.key, self.value, self.timestamp]
+
+    @classmethod
+    def from_row(cls, row: List) -> 'WALEntry':
+        entry = cls(_OP_BY_VALUE[row[1]], row[2], row[3], row[4])
+        entry.sequence_number = row[0]
+        return entry
+
 
 class WriteAheadLog:
     """
@@ -49,98 +89,454 @@ class WriteAheadLog:
     All operations are logged before being applied to the main data structure.
     """
     
-    def __init__(self, wal_file: str = "wal.log"):
+    # How long the background thread waits between fsync batches (seconds).
+    # All writes queued during one interval share a single fsync.
+    DEFAULT_SYNC_INTERVAL = 0.001
+
+    def __init__(self, wal_file: str = "wal.log", sync_interval: float = DEFAULT_SYNC_INTERVAL):
         self.wal_file = wal_file
         self.sequence_counter = 0
+        self.sync_interval = sync_interval
         self.lock = threading.Lock()
+        self._pending_syncs: List[threading.Event] = []
+        self._sync_lock = threading.Lock()
+        # Group-commit buffer (guarded by self.lock): writers frame records
+        # into it and return; the committer thread drains it with a single
+        # write call per batch
+        self._wal_buf = bytearray()
+        # Sparse record index, appended per logged record: (sequence,
+        # byte offset, operation value). Lets truncation and incremental
+        # reads cut the file at an offset instead of re-parsing every
+        # entry. Covers records appended by this process; records already
+        # in the file at open time fall back to a full parse.
+        self._offset_index: List[Tuple[int, int, str]] = []
         self._initialize_wal()
+
+        # Background group-commit thread: one write + one fsync covers all
+        # records queued during each interval
+        self._sync_thread = threading.Thread(target=self._sync_loop, daemon=True)
+        self._sync_thread.start()
     
     def _initialize_wal(self):
-        """Initialize WAL file and recover sequence counter"""
-        if os.path.exists(self.wal_file):
-            # Recover sequence counter from existing WAL
+        """Initialize WAL file, recover sequence counter, and seed stats counters"""
+        self._total_entries = 0
+        self._put_count = 0
+        self._delete_count = 0
+        self._wal_bytes = 0
+
+        # One persistent append-mode fd for the life of the log: no
+        # open/close syscall pair per batch. O_APPEND keeps it valid
+        # across in-place truncation (same inode, writes land at EOF).
+        # Deliberately not preallocated: posix_fallocate extends st_size,
+        # which would push O_APPEND writes past a run of zero bytes and
+        # break the newline-delimited record scan.
+        self._write_fd = os.open(self.wal_file,
+                                 os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+        # fstat on the held fd: no path resolution, unlike os.path.getsize
+        self._wal_bytes = os.fstat(self._write_fd).st_size
+        # Recovering the sequence counter only needs the last intact
+        # record, so scan backward from EOF instead of reading the file.
+        # Stats counters are seeded lazily by the first full read (which
+        # recovery performs anyway) rather than by a second pass here.
+        self._stats_seeded = self._wal_bytes == 0
+        if self._wal_bytes:
             try:
-                with open(self.wal_file, 'r') as f:
-                    lines = f.readlines()
-                    if lines:
-                        last_line = lines[-1].strip()
-                        if last_line:
-                            last_entry = json.loads(last_line)
-                            self.sequence_counter = last_entry.get('sequence_number', 0)
-            except (json.JSONDecodeError, IOError):
+                self._recover_sequence_counter()
+            except IOError:
                 self.sequence_counter = 0
-        else:
-            # Create new WAL file
-            open(self.wal_file, 'a').close()
+
+    def _recover_sequence_counter(self):
+        """Read the sequence counter from the last intact record by
+        scanning backward from the end of the file in 4 KiB blocks"""
+        with open(self.wal_file, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            pos = f.tell()
+            tail = b''
+            while pos > 0:
+                step = min(4096, pos)
+                pos -= step
+                f.seek(pos)
+                tail = f.read(step) + tail
+                lines = tail.split(b'\n')
+                # The first chunk element may be a partial line unless the
+                # scan has reached the start of the file
+                for raw in reversed(lines if pos == 0 else lines[1:]):
+                    line = raw.strip().decode('utf-8', 'replace')
+                    if not line:
+                        continue
+                    record = self._parse_record(line)
+                    if record is None:
+                        continue  # Torn or corrupt tail record
+                    sequence = (record[0] if isinstance(record, list)
+                                else record.get('sequence_number'))
+                    if sequence is not None:
+                        self.sequence_counter = sequence
+                        return
+
+    @staticmethod
+    def _frame_into(buf: bytearray, payload: bytes):
+        """Append one framed record to buf: b'<8-hex-crc> <json>\\n'"""
+        buf += b'%08x ' % _checksum(payload)
+        buf += payload
+        buf += b'\n'
+
+    @staticmethod
+    def _parse_record(line: str) -> Optional[Any]:
+        """
+        Parse one WAL line, verifying its checksum. Lines without a checksum
+        prefix (written before checksumming existed) are accepted as-is.
+        Returns the decoded record — a compact row list, or a dict for
+        records written by older versions — or None if the line is corrupt.
+        """
+        if line.startswith('{'):
+            # Legacy record without checksum prefix
+            try:
+                return serialization.loads(line)
+            except ValueError:
+                return None
+
+        crc_hex, _, payload = line.partition(' ')
+        if len(crc_hex) != 8 or not payload:
+            return None
+        try:
+            if int(crc_hex, 16) != _checksum(payload.encode('utf-8')):
+                return None  # Partial or torn write
+            return serialization.loads(payload)
+        except ValueError:
+            return None
+
+    def _count_entry(self, operation_value: str):
+        """Update the incremental stats counters for one logged entry"""
+        self._total_entries += 1
+        if operation_value == WALOperation.PUT.value:
+            self._put_count += 1
+        elif operation_value == WALOperation.DELETE.value:
+            self._delete_count += 1
     
-    def log_operation(self, operation: WALOperation, key: str, value: Any = None) -> int:
+    def _flush_pending_locked(self):
+        """Write buffered records to the WAL file; self.lock must be held"""
+        if not self._wal_buf:
+            return
+        os.write(self._write_fd, self._wal_buf)
+        self._wal_buf.clear()
+
+    def _sync_loop(self):
+        """Background group-commit loop: one write + fsync per batch of writers"""
+        while True:
+            time.sleep(self.sync_interval)
+            with self._sync_lock:
+                waiters = self._pending_syncs
+                self._pending_syncs = []
+
+            error = None
+            try:
+                with self.lock:
+                    self._flush_pending_locked()
+                if waiters:
+                    _datasync(self._write_fd)
+            except (IOError, OSError) as exc:
+                # Hand the failure to every waiter in the batch; reporting
+                # durable success for a failed write/fsync would break the
+                # durability contract sync writers rely on
+                error = exc
+
+            for event in waiters:
+                event.sync_error = error
+                event.set()
+
+    def log_operation(self, operation: WALOperation, key: str, value: Any = None,
+                      sync: bool = True) -> int:
         """
         Log an operation to the WAL before it's applied to the data structure.
+        The record joins the group-commit buffer; the committer thread
+        writes and fsyncs each batch with no buffered-file layer in
+        between. With sync=True the call blocks until the entry has been
+        fsynced; with sync=False it returns right away.
         Returns the sequence number of the logged operation.
         """
+        # Serialize the expensive part — the value — outside the lock;
+        # only the sequence number has to wait for it. Writers therefore
+        # contend on a few appends, not on each other's encoding.
+        rest = serialization.dumps_bytes(
+            [operation.value, key, value, time.time_ns()])
+
         with self.lock:
             self.sequence_counter += 1
-            entry = WALEntry(operation, key, value)
-            entry.sequence_number = self.sequence_counter
-            
-            # Write to WAL file
-            with open(self.wal_file, 'a') as f:
-                f.write(json.dumps(entry.to_dict()) + '\n')
-                f.flush()  # Ensure data is written to disk immediately
-                os.fsync(f.fileno())  # Force OS to write to disk
-            
+            sequence = self.sequence_counter
+
+            # Splice the sequence number into the pre-encoded row, then
+            # frame into the shared group-commit buffer; the committer
+            # thread writes the whole batch with one write + one fsync
+            before = len(self._wal_buf)
+            self._offset_index.append((sequence, self._wal_bytes, operation.value))
+            self._frame_into(self._wal_buf, b'[%d,%s' % (sequence, rest[1:]))
+
+            self._count_entry(operation.value)
+            self._wal_bytes += len(self._wal_buf) - before
+
+            if sync:
+                event = threading.Event()
+                with self._sync_lock:
+                    self._pending_syncs.append(event)
+
+        # Wait for the group commit outside the write lock so other
+        # writers can queue up behind the same write+fsync
+        if sync:
+            event.wait()
+            if event.sync_error is not None:
+                raise event.sync_error
+
+        return sequence
+
+    def log_batch(self, operations: List[Tuple[WALOperation, str, Any]]) -> int:
+        """
+        Append multiple operations under one lock; the whole batch joins
+        the group-commit buffer and reaches disk in a single write call.
+        Each record is a normal WAL line, so replay needs no special frame
+        handling. Durability is left to the group-commit thread; callers
+        that need it should follow up with sync().
+        Returns the sequence number of the last logged operation.
+        """
+        # Pre-encode every record outside the lock (see log_operation)
+        encoded = [
+            (operation.value,
+             serialization.dumps_bytes([operation.value, key, value,
+                                        time.time_ns()]))
+            for operation, key, value in operations
+        ]
+
+        with self.lock:
+            before = len(self._wal_buf)
+            for op_value, rest in encoded:
+                self.sequence_counter += 1
+                self._offset_index.append(
+                    (self.sequence_counter,
+                     self._wal_bytes + len(self._wal_buf) - before,
+                     op_value))
+                self._frame_into(self._wal_buf,
+                                 b'[%d,%s' % (self.sequence_counter, rest[1:]))
+                self._count_entry(op_value)
+
+            self._wal_bytes += len(self._wal_buf) - before
             return self.sequence_counter
+
+    def sync(self):
+        """
+        Block until all previously appended entries have been fsynced.
+        Raises the write/fsync error from the committer thread if the
+        batch failed to reach disk.
+        """
+        event = threading.Event()
+        with self._sync_lock:
+            self._pending_syncs.append(event)
+        event.wait()
+        if event.sync_error is not None:
+            raise event.sync_error
     
+    def iter_entries(self) -> Iterator[WALEntry]:
+        """
+        Stream entries from the WAL one record at a time. Recovery-sized
+        logs never materialize as a list: each entry is yielded, applied
+        by the caller, and garbage-collected before the next is decoded.
+        """
+        # Drain the group-commit buffer first so just-logged records are
+        # visible even before the committer's next pass; the file itself
+        # always exists (created with O_CREAT at init)
+        with self.lock:
+            self._flush_pending_locked()
+
+        total = puts = 0
+        with open(self.wal_file, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size:
+                # Scan straight from the page cache, as SSTable loading
+                # does: no buffered-I/O layer or readline copies
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    if hasattr(mm, 'madvise'):
+                        mm.madvise(mmap.MADV_SEQUENTIAL)
+                    for entry in self._iter_lines(self._mapped_lines(mm, size)):
+                        total += 1
+                        puts += entry.operation is WALOperation.PUT
+                        yield entry
+
+        if not self._stats_seeded:
+            # A complete pass has seen exactly the file contents, so seed
+            # the counters here instead of scanning again at startup
+            self._total_entries = total
+            self._put_count = puts
+            self._delete_count = total - puts
+            self._stats_seeded = True
+
     def get_all_entries(self) -> List[WALEntry]:
-        """Retrieve all entries from the WAL for recovery purposes"""
-        entries = []
-        if not os.path.exists(self.wal_file):
-            return entries
-        
+        """Retrieve all entries from the WAL as a list (see iter_entries)"""
+        return list(self.iter_entries())
+
+    @staticmethod
+    def _mapped_lines(mm, size: int) -> Iterator[str]:
+        """Yield decoded lines from a memory-mapped WAL"""
+        pos = 0
+        while pos < size:
+            newline = mm.find(b'\n', pos)
+            end = size if newline == -1 else newline
+            yield mm[pos:end].decode('utf-8', 'replace')
+            pos = end + 1
+
+    def _iter_lines(self, lines) -> Iterator[WALEntry]:
+        """Decode WAL records from an iterable of text lines"""
+        for line in lines:
+            line = line.strip()
+            if line:
+                record = self._parse_record(line)
+                if record is not None:
+                    yield (WALEntry.from_row(record) if isinstance(record, list)
+                           else WALEntry.from_dict(record))
+
+    def _read_entries(self) -> List[WALEntry]:
+        """Read every entry from the WAL file (no locking or draining)"""
         with open(self.wal_file, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if line:
-                    try:
-                        entry_data = json.loads(line)
-                        entries.append(WALEntry.from_dict(entry_data))
-                    except json.JSONDecodeError:
-                        continue  # Skip corrupted entries
-        
-        return entries
+            return list(self._iter_lines(f))
     
     def get_entries_after_sequence(self, sequence_number: int) -> List[WALEntry]:
         """Get all entries after a specific sequence number for incremental recovery"""
+        with self.lock:
+            self._flush_pending_locked()
+            # First indexed record past the requested sequence; seeking to
+            # its offset reads only the unreplayed suffix
+            start = bisect.bisect_left(self._offset_index, (sequence_number + 1,))
+            if self._offset_index and (start > 0 or self._offset_index[0][1] == 0):
+                offset = (self._offset_index[start][1]
+                          if start < len(self._offset_index) else self._wal_bytes)
+                with open(self.wal_file, 'rb') as f:
+                    f.seek(offset)
+                    suffix = f.read()
+                return list(self._iter_lines(
+                    suffix.decode('utf-8', 'replace').splitlines()))
+
+        # No offsets for the requested range (records predate this
+        # process): fall back to reading and filtering the whole file
         all_entries = self.get_all_entries()
         return [entry for entry in all_entries if entry.sequence_number > sequence_number]
     
     def truncate_before_sequence(self, sequence_number: int):
         """Remove WAL entries before a specific sequence number (used after compaction)"""
         with self.lock:
-            entries = self.get_all_entries()
+            self._flush_pending_locked()
+            cut = bisect.bisect_left(self._offset_index, (sequence_number,))
+
+            # Fast path: the offset index pins where the cut lands, so the
+            # surviving tail is copied byte-for-byte with one read and one
+            # write — no per-entry parse or re-encode. Requires either a
+            # strictly-older head (cut > 0) or an index that covers the
+            # file from offset zero.
+            if self._offset_index and (cut > 0 or self._offset_index[0][1] == 0):
+                cut_offset = (self._offset_index[cut][1]
+                              if cut < len(self._offset_index) else self._wal_bytes)
+                tail_len = self._copy_tail(cut_offset)
+
+                self._offset_index = [
+                    (seq, offset - cut_offset, op)
+                    for seq, offset, op in self._offset_index[cut:]
+                ]
+                self._total_entries = 0
+                self._put_count = 0
+                self._delete_count = 0
+                for _, _, op in self._offset_index:
+                    self._count_entry(op)
+                self._wal_bytes = tail_len
+                self._stats_seeded = True
+                return
+
+            # Slow path (records predating this process, so no offsets):
+            # parse, filter, and rewrite, rebuilding the index as we go
+            entries = self._read_entries()
             remaining_entries = [entry for entry in entries if entry.sequence_number >= sequence_number]
-            
-            # Rewrite WAL file with remaining entries
-            with open(self.wal_file, 'w') as f:
-                for entry in remaining_entries:
-                    f.write(json.dumps(entry.to_dict()) + '\n')
+
+            buf = bytearray()
+            self._offset_index = []
+            for entry in remaining_entries:
+                self._offset_index.append(
+                    (entry.sequence_number, len(buf), entry.operation.value))
+                self._frame_into(buf, serialization.dumps_bytes(entry.to_row()))
+            with open(self.wal_file, 'wb') as f:
+                f.write(buf)
+
+            # Reseed the stats counters from the surviving entries
+            self._total_entries = 0
+            self._put_count = 0
+            self._delete_count = 0
+            for entry in remaining_entries:
+                self._count_entry(entry.operation.value)
+            self._wal_bytes = len(buf)
+            self._stats_seeded = True
     
+    def _copy_tail(self, cut_offset: int) -> int:
+        """
+        Replace the WAL with its own suffix starting at cut_offset using a
+        temp file and an atomic rename; sendfile copies kernel-to-kernel
+        with no userspace buffer where available. Returns the tail length.
+        self.lock must be held.
+        """
+        temp_file = self.wal_file + '.tmp'
+        src_fd = os.open(self.wal_file, os.O_RDONLY)
+        tmp_fd = os.open(temp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            remaining = os.fstat(src_fd).st_size - cut_offset
+            tail_len = remaining
+            if hasattr(os, 'sendfile'):
+                offset = cut_offset
+                while remaining > 0:
+                    sent = os.sendfile(tmp_fd, src_fd, offset, remaining)
+                    if sent == 0:
+                        break
+                    offset += sent
+                    remaining -= sent
+            else:
+                os.lseek(src_fd, cut_offset, os.SEEK_SET)
+                while True:
+                    chunk = os.read(src_fd, 1 << 20)
+                    if not chunk:
+                        break
+                    os.write(tmp_fd, chunk)
+            os.fsync(tmp_fd)
+        finally:
+            os.close(src_fd)
+            os.close(tmp_fd)
+        os.replace(temp_file, self.wal_file)
+
+        # The rename swapped inodes, so reopen the persistent append fd
+        os.close(self._write_fd)
+        self._write_fd = os.open(self.wal_file,
+                                 os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        return tail_len
+
+    def close(self):
+        """Release the persistent write descriptor"""
+        with self.lock:
+            self._flush_pending_locked()
+            os.close(self._write_fd)
+
     def clear(self):
         """Clear the WAL file (use with caution)"""
         with self.lock:
+            self._wal_buf.clear()
+            self._offset_index = []
             open(self.wal_file, 'w').close()
             self.sequence_counter = 0
+            self._total_entries = 0
+            self._put_count = 0
+            self._delete_count = 0
+            self._wal_bytes = 0
+            self._stats_seeded = True
     
     def get_stats(self) -> Dict:
-        """Get WAL statistics"""
-        entries = self.get_all_entries()
-        put_count = sum(1 for e in entries if e.operation == WALOperation.PUT)
-        delete_count = sum(1 for e in entries if e.operation == WALOperation.DELETE)
-        
+        """Get WAL statistics from the incremental counters in O(1)"""
+        if not self._stats_seeded:
+            self.get_all_entries()  # One-time counter seed from the file
         return {
-            'total_entries': len(entries),
-            'put_operations': put_count,
-            'delete_operations': delete_count,
+            'total_entries': self._total_entries,
+            'put_operations': self._put_count,
+            'delete_operations': self._delete_count,
             'current_sequence': self.sequence_counter,
-            'wal_file_size': os.path.getsize(self.wal_file) if os.path.exists(self.wal_file) else 0
+            'wal_file_size': self._wal_bytes
         }
@@ -1,38 +1,142 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+from flask import Flask, render_template, request, jsonify, redirect, url_for, Response, stream_with_context
+from flask.json.provider import JSONProvider
 import json
 import os
+import threading
+import time
 from datetime import datetime
 from typing import Dict, Any
 
+import serialization
 from kv_store import create_kv_store
 
+
+class FastJSONProvider(JSONProvider):
+    """JSON provider backed by the orjson-based serialization helpers,
+    so jsonify responses (stats, health, data endpoints) encode in C"""
+
+    def dumps(self, obj, **kwargs) -> str:
+        # serialize_for_json handles the odd datetime or custom object
+        # without dropping the whole payload back to the stdlib encoder
+        return serialization.dumps(obj, default=serialize_for_json)
+
+    def loads(self, s, **kwargs):
+        return serialization.loads(s)
+
+
 # Create Flask app
 app = Flask(__name__)
 app.secret_key = 'kv_store_demo_key'
+app.json = FastJSONProvider(app)
+
+# Optional response compression: repetitive JSON (keys, stats, ranges)
+# shrinks several-fold over the wire when flask-compress is installed
+try:
+    from flask_compress import Compress
+
+    app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+    app.config['COMPRESS_MIN_SIZE'] = 500
+    Compress(app)
+except ImportError:
+    pass  # Served uncompressed without the optional dependency
 
 # Initialize key-value store
 kv_store = create_kv_store(data_dir="web_kv_data", wal_file="web_kv_wal.log")
 
+# Bound once at import: the per-item decode loops call this per value,
+# and a local name skips the module attribute lookup each iteration
+_loads = serialization.loads
+
+# Characters that can open a JSON document ({, [, strings, numbers,
+# true/false/null). Anything else cannot parse, so the heuristics below
+# skip the decoder — and its raised-and-swallowed exception — entirely.
+_JSON_START = frozenset('{["-0123456789tfn')
+
+
+def _coerce_json(value: str):
+    """Parse a string that plausibly encodes JSON; return it unchanged otherwise"""
+    if value.lstrip()[:1] in _JSON_START:
+        try:
+            return _loads(value)
+        except ValueError:
+            pass  # Keep as string if not valid JSON
+    return value
+
+
+class TTLCache:
+    """
+    Serve a recent snapshot of an expensive call for a short window.
+    Dashboard polling hits stats/health/keys far more often than the
+    store changes; a sub-second TTL absorbs that fan-in.
+
+    Misses are single-flight: the value is computed while holding the
+    lock, so when N requests arrive on an expired entry one of them
+    refreshes it and the rest block briefly and reuse the result —
+    concurrent identical queries never fan out to the store.
+    """
+
+    def __init__(self, fn, ttl: float):
+        self.fn = fn
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self._value = None
+        self._expires = 0.0
+
+    def get(self):
+        with self.lock:
+            now = time.monotonic()
+            if now >= self._expires:
+                self._value = self.fn()
+                self._expires = now + self.ttl
+            return self._value
+
+    def invalidate(self):
+        with self.lock:
+            self._expires = 0.0
+
+
+_stats_cache = TTLCache(lambda: kv_store.get_stats(), 0.5)
+_health_cache = TTLCache(lambda: kv_store.health_check(), 0.5)
+_keys_cache = TTLCache(lambda: kv_store.get_all_keys(), 0.5)
+
+
+def _invalidate_caches():
+    """Drop cached snapshots after a mutation so reads stay current"""
+    _stats_cache.invalidate()
+    _health_cache.invalidate()
+    _keys_cache.invalidate()
+
+# Converters for non-JSON types, keyed by exact type so lookup is a
+# single dict probe instead of a chain of isinstance checks
+_JSON_CONVERTERS = {
+    datetime: datetime.isoformat,
+}
+
 # Helper function to serialize data for JSON responses
 def serialize_for_json(obj):
     """Convert objects to JSON serializable format"""
-    if isinstance(obj, datetime):
-        return obj.isoformat()
-    return str(obj)
+    convert = _JSON_CONVERTERS.get(type(obj))
+    if convert is not None:
+        return convert(obj)
+    # Raising instead of falling back to str(obj) surfaces bugs where a
+    # non-JSON object sneaks into a response, rather than silently
+    # shipping a lossy repr of it
+    raise TypeError(f"unsupported: {type(obj).__name__}")
 
 @app.route('/')
 def index():
     """Main dashboard page"""
     try:
-        stats = kv_store.get_stats()
-        health = kv_store.health_check()
-        all_keys = kv_store.get_all_keys()[:50]  # Limit to first 50 keys for display
+        stats = _stats_cache.get()
+        health = _health_cache.get()
+        # One key enumeration serves both the preview slice and the total
+        all_keys = _keys_cache.get()
         
         return render_template('index.html', 
                              stats=stats, 
                              health=health, 
-                             keys=all_keys,
-                             total_keys=len(kv_store.get_all_keys()))
+                             keys=all_keys[:50],  # Limit display to first 50
+                             total_keys=len(all_keys))
     except Exception as e:
         return render_template('error.html', error=str(e))
 
@@ -40,7 +144,7 @@ def index():
 def api_stats():
     """API endpoint for statistics"""
     try:
-        stats = kv_store.get_stats()
+        stats = _stats_cache.get()
         return jsonify({
             'success': True,
             'data': stats
@@ -55,7 +159,7 @@ def api_stats():
 def api_health():
     """API endpoint for health check"""
     try:
-        health = kv_store.health_check()
+        health = _health_cache.get()
         return jsonify({
             'success': True,
             'data': health
@@ -70,7 +174,7 @@ def api_health():
 def api_keys():
     """API endpoint to get all keys"""
     try:
-        keys = kv_store.get_all_keys()
+        keys = _keys_cache.get()
         return jsonify({
             'success': True,
             'data': keys,
@@ -103,7 +207,9 @@ def api_get(key):
 def api_put():
     """API endpoint to put a key-value pair"""
     try:
-        data = request.get_json()
+        # Decode the raw bytes with the C parser; request.get_json would
+        # route through the stdlib and decode to str first
+        data = serialization.loads(request.get_data(cache=False))
         if not data or 'key' not in data or 'value' not in data:
             return jsonify({
                 'success': False,
@@ -115,12 +221,14 @@ def api_put():
         
         # Try to parse value as JSON if it looks like JSON
         if isinstance(value, str):
-            try:
-                value = json.loads(value)
-            except json.JSONDecodeError:
-                pass  # Keep as string if not valid JSON
+            value = _coerce_json(value)
         
         success = kv_store.put(key, value)
+        _invalidate_caches()
+        # The echo re-serializes the value rather than splicing the raw
+        # request bytes back into the response: _coerce_json may have
+        # changed what was stored, and the dashboard JS relies on seeing
+        # the stored form.
         return jsonify({
             'success': success,
             'key': key,
@@ -137,6 +245,7 @@ def api_delete(key):
     """API endpoint to delete a key"""
     try:
         success = kv_store.delete(key)
+        _invalidate_caches()
         return jsonify({
             'success': True,
             'key': key,
@@ -152,7 +261,7 @@ def api_delete(key):
 def api_batch_put():
     """API endpoint for batch put operations"""
     try:
-        data = request.get_json()
+        data = serialization.loads(request.get_data(cache=False))
         if not data or 'items' not in data:
             return jsonify({
                 'success': False,
@@ -162,22 +271,20 @@ def api_batch_put():
         items = data['items']
         
         # Parse JSON values if they look like JSON
-        processed_items = {}
-        for key, value in items.items():
-            if isinstance(value, str):
-                try:
-                    processed_items[key] = json.loads(value)
-                except json.JSONDecodeError:
-                    processed_items[key] = value
-            else:
-                processed_items[key] = value
+        processed_items = {
+            key: _coerce_json(value) if isinstance(value, str) else value
+            for key, value in items.items()
+        }
         
         results = kv_store.batch_put(processed_items)
+        _invalidate_caches()
+        # all() short-circuits on the common everything-succeeded case
+        successful = len(results) if all(results.values()) else sum(results.values())
         return jsonify({
             'success': True,
             'results': results,
             'total': len(items),
-            'successful': sum(results.values())
+            'successful': successful
         })
     except Exception as e:
         return jsonify({
@@ -185,6 +292,16 @@ def api_batch_put():
             'error': str(e)
         }), 500
 
+@app.route('/api/keys/stream')
+def api_keys_stream():
+    """Stream all keys as newline-delimited JSON"""
+    def generate():
+        for key in _keys_cache.get():
+            yield serialization.dumps_bytes(key) + b'\n'
+
+    return Response(stream_with_context(generate()),
+                    mimetype='application/x-ndjson')
+
 @app.route('/api/range')
 def api_range():
     """API endpoint for range queries"""
@@ -206,11 +323,27 @@ def api_range():
             'error': str(e)
         }), 500
 
+@app.route('/api/range/stream')
+def api_range_stream():
+    """Stream a range query as newline-delimited [key, value] rows"""
+    start_key = request.args.get('start')
+    end_key = request.args.get('end')
+
+    def generate():
+        # iter_range resolves one key at a time off a snapshot, so peak
+        # memory stays flat no matter how large the range is
+        for key, value in kv_store.iter_range(start_key, end_key):
+            yield serialization.dumps_bytes([key, value]) + b'\n'
+
+    return Response(stream_with_context(generate()),
+                    mimetype='application/x-ndjson')
+
 @app.route('/api/clear', methods=['POST'])
 def api_clear():
     """API endpoint to clear all data"""
     try:
         kv_store.clear()
+        _invalidate_caches()
         return jsonify({
             'success': True,
             'message': 'All data cleared successfully'
@@ -226,6 +359,7 @@ def api_flush():
     """API endpoint to force flush memtable"""
     try:
         kv_store.force_flush()
+        _invalidate_caches()
         return jsonify({
             'success': True,
             'message': 'Memtable flushed successfully'
@@ -241,6 +375,7 @@ def api_compact():
     """API endpoint to force compaction"""
     try:
         kv_store.force_compaction()
+        _invalidate_caches()
         return jsonify({
             'success': True,
             'message': 'Compaction completed successfully'
@@ -255,8 +390,10 @@ def api_compact():
 def data_page():
     """Data management page"""
     try:
-        all_items = kv_store.get_all_items()
-        return render_template('data.html', items=all_items)
+        # Serve the page shell immediately; the browser hydrates the
+        # table from /api/range/stream so first paint doesn't wait on a
+        # full store scan
+        return render_template('data.html')
     except Exception as e:
         return render_template('error.html', error=str(e))
 
@@ -269,7 +406,7 @@ def operations_page():
 def analytics_page():
     """Analytics and visualization page"""
     try:
-        stats = kv_store.get_stats()
+        stats = _stats_cache.get()
         return render_template('analytics.html', stats=stats)
     except Exception as e:
         return render_template('error.html', error=str(e))
@@ -279,37 +416,41 @@ def demo_page():
     """Demo page with sample data"""
     return render_template('demo.html')
 
+# Built once at import: the demo payload is constant, so each request
+# reuses it instead of re-allocating the nested literals
+_SAMPLE_DATA = {
+    'user_1': {'name': 'Alice Johnson', 'age': 28, 'role': 'Developer', 'email': 'alice@example.com'},
+    'user_2': {'name': 'Bob Smith', 'age': 35, 'role': 'Manager', 'email': 'bob@example.com'},
+    'user_3': {'name': 'Charlie Brown', 'age': 22, 'role': 'Intern', 'email': 'charlie@example.com'},
+    'product_laptop': {'name': 'Gaming Laptop', 'price': 1299.99, 'category': 'Electronics', 'stock': 15},
+    'product_mouse': {'name': 'Wireless Mouse', 'price': 29.99, 'category': 'Electronics', 'stock': 120},
+    'product_keyboard': {'name': 'Mechanical Keyboard', 'price': 89.99, 'category': 'Electronics', 'stock': 45},
+    'config_app_name': 'My Application',
+    'config_version': '1.2.3',
+    'config_debug': True,
+    'config_max_users': 1000,
+    'session_abc123': {'user_id': 'user_1', 'login_time': '2024-01-15T10:30:00', 'expires': '2024-01-15T18:30:00'},
+    'session_def456': {'user_id': 'user_2', 'login_time': '2024-01-15T11:45:00', 'expires': '2024-01-15T19:45:00'},
+    'cache_popular_products': ['product_laptop', 'product_mouse'],
+    'metrics_daily_users': 2547,
+    'metrics_total_sales': 45678.90,
+    'log_error_001': {'timestamp': '2024-01-15T14:30:00', 'level': 'ERROR', 'message': 'Database connection failed'},
+    'log_info_002': {'timestamp': '2024-01-15T14:35:00', 'level': 'INFO', 'message': 'Database connection restored'}
+}
+
+
 @app.route('/api/demo/load_sample', methods=['POST'])
 def api_load_sample_data():
     """Load sample data for demonstration"""
     try:
-        sample_data = {
-            'user_1': {'name': 'Alice Johnson', 'age': 28, 'role': 'Developer', 'email': 'alice@example.com'},
-            'user_2': {'name': 'Bob Smith', 'age': 35, 'role': 'Manager', 'email': 'bob@example.com'},
-            'user_3': {'name': 'Charlie Brown', 'age': 22, 'role': 'Intern', 'email': 'charlie@example.com'},
-            'product_laptop': {'name': 'Gaming Laptop', 'price': 1299.99, 'category': 'Electronics', 'stock': 15},
-            'product_mouse': {'name': 'Wireless Mouse', 'price': 29.99, 'category': 'Electronics', 'stock': 120},
-            'product_keyboard': {'name': 'Mechanical Keyboard', 'price': 89.99, 'category': 'Electronics', 'stock': 45},
-            'config_app_name': 'My Application',
-            'config_version': '1.2.3',
-            'config_debug': True,
-            'config_max_users': 1000,
-            'session_abc123': {'user_id': 'user_1', 'login_time': '2024-01-15T10:30:00', 'expires': '2024-01-15T18:30:00'},
-            'session_def456': {'user_id': 'user_2', 'login_time': '2024-01-15T11:45:00', 'expires': '2024-01-15T19:45:00'},
-            'cache_popular_products': ['product_laptop', 'product_mouse'],
-            'metrics_daily_users': 2547,
-            'metrics_total_sales': 45678.90,
-            'log_error_001': {'timestamp': '2024-01-15T14:30:00', 'level': 'ERROR', 'message': 'Database connection failed'},
-            'log_info_002': {'timestamp': '2024-01-15T14:35:00', 'level': 'INFO', 'message': 'Database connection restored'}
-        }
-        
-        results = kv_store.batch_put(sample_data)
-        successful = sum(results.values())
+        results = kv_store.batch_put(_SAMPLE_DATA)
+        _invalidate_caches()
+        successful = len(results) if all(results.values()) else sum(results.values())
         
         return jsonify({
             'success': True,
-            'message': f'Sample data loaded: {successful}/{len(sample_data)} items',
-            'total': len(sample_data),
+            'message': f'Sample data loaded: {successful}/{len(_SAMPLE_DATA)} items',
+            'total': len(_SAMPLE_DATA),
             'successful': successful,
             'results': results
         })
@@ -334,7 +475,12 @@ if __name__ == '__main__':
     os.makedirs('static/css', exist_ok=True)
     os.makedirs('static/js', exist_ok=True)
     
-    # Run Flask app
+    # Development server only — production deployments should run the
+    # Gunicorn command from the README (multiple gthread workers, tuned
+    # keep-alive) against the module-level `app`.
+    # Handlers block on store I/O (WAL fsync, flushes), so serve each
+    # request on its own thread; the store's reader-writer lock keeps
+    # concurrent handlers safe.
     print("Starting Key-Value Store Web Interface...")
     print("Access the application at: http://localhost:5001")
-    app.run(debug=True, host='0.0.0.0', port=5001)
+    app.run(debug=True, host='0.0.0.0', port=5001, threaded=True)